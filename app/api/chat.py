@@ -2,12 +2,14 @@
 from fastapi import APIRouter, HTTPException, Query, Depends
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+import asyncio
 import logging
 import json
 
 from app.services.vector_store import VectorStore
 from app.services.llm_engine import LLMEngine, Streaming
+from app.services.rate_limit import run_llm, stream_llm
 from app.services.context_assembler import assemble_context
 from app.services.intent import detect_intent
 from app.dependencies import get_vector_store
@@ -46,16 +48,16 @@ class TermsExtractionRequest(BaseModel):
 
 def _process_chat_request(
     message: str,
-    conversation_history: Optional[List[Dict[str, str]]],
-    vector_store: VectorStore
+    vector_store: VectorStore,
+    intent: str,
 ) -> Dict[str, Any]:
     """
     Process a chat request and return structured data for both streaming and non-streaming endpoints.
     
     Args:
         message: User's message/query
-        conversation_history: Conversation history as list of dicts with 'role' and 'content'
         vector_store: VectorStore instance
+        intent: Intent from detect_intent ("inventory", "capabilities", "rag")
         
     Returns:
         Dictionary with keys:
@@ -69,12 +71,6 @@ def _process_chat_request(
         - source_documents: List of source document metadata (for non-streaming)
         - requires_llm: Boolean indicating if LLM call is needed
     """
-    # Convert conversation history format if needed
-    history = conversation_history or []
-    
-    # Detect intent
-    intent = detect_intent(message, conversation_history=history)
-    
     # Assemble context
     ctx = assemble_context(vector_store, message, n_results=12, require_keyword=True)
     user_query = ctx.get("processed_query") or message
@@ -213,19 +209,23 @@ def _process_chat_request(
             if fname:
                 allowed_names.append(fname)
     
-    # Build source documents metadata
-    sources_dict = {}
+    # Build source documents metadata: one entry per file, from its best-scoring chunk
+    best_by_file: Dict[str, Tuple[float, Dict[str, Any]]] = {}
     for doc in top_context:
-        md = doc.get("metadata", {})
-        fname = md.get("file_name", "Unknown")
-        if fname not in sources_dict:
-            sources_dict[fname] = {
-                "file_name": fname,
-                "file_path": md.get("file_path", "N/A"),
-                "similarity_score": doc.get("final_score", doc.get("similarity_score", 0.0)),
-                "excerpt": (doc.get("content", "")[:200] + "...") if len(doc.get("content", "")) > 200 else doc.get("content", ""),
-            }
-    source_documents = list(sources_dict.values())
+        fname = doc.get("metadata", {}).get("file_name", "Unknown")
+        score = doc.get("final_score", doc.get("similarity_score", 0.0))
+        if fname not in best_by_file or score > best_by_file[fname][0]:
+            best_by_file[fname] = (score, doc)
+    source_documents = []
+    for fname, (score, doc) in best_by_file.items():
+        content = doc.get("content", "")
+        source_documents.append({
+            "file_name": fname,
+            "file_path": doc.get("metadata", {}).get("file_path", "N/A"),
+            "similarity_score": score,
+            # Excerpt is sliced once per file, only for the chunk that is kept
+            "excerpt": content[:200] + "..." if len(content) > 200 else content,
+        })
     
     return {
         "intent": intent,
@@ -259,8 +259,9 @@ async def chat_query(
                 for msg in request.conversation_history
             ]
         
-        # Process request using shared logic
-        result = _process_chat_request(request.message, conversation_history, vector_store)
+        # Detect intent under the shared LLM limit, then process the request using shared logic
+        intent = await run_llm(detect_intent, request.message, conversation_history=conversation_history or [])
+        result = await asyncio.to_thread(_process_chat_request, request.message, vector_store, intent)
         
         # If answer is already determined (no LLM needed), return it
         if not result["requires_llm"]:
@@ -283,7 +284,8 @@ async def chat_query(
         )
         
         # Pass pre-built messages to LLM engine
-        answer = LLMEngine.chat(
+        answer = await run_llm(
+            LLMEngine.chat,
             messages=messages,
             allowed_filenames=result["allowed_names"],
         )
@@ -309,9 +311,9 @@ async def chat_query(
             )
         
         # DEBUG: Log final answer before sending to frontend
-        import sys
-        newline_char = '\n'
-        debug_msg = f"""
+        if logger.isEnabledFor(logging.DEBUG):
+            newline_char = '\n'
+            debug_msg = f"""
 {'=' * 80}
 FINAL ANSWER (before JSON serialization):
 {'=' * 80}
@@ -321,9 +323,7 @@ Lines (split by \\n): {len(answer.split(newline_char))}
 First 500 chars: {repr(answer[:500])}
 {'=' * 80}
 """
-        logger.info(debug_msg)
-        print(debug_msg, file=sys.stderr)  # Print to stderr for visibility
-        sys.stderr.flush()  # Force flush
+            logger.debug(debug_msg)
         
         return {
             "status": "success",
@@ -352,8 +352,9 @@ async def chat_query_stream(
                 for msg in request.conversation_history
             ]
         
-        # Process request using shared logic
-        result = _process_chat_request(request.message, conversation_history, vector_store)
+        # Detect intent under the shared LLM limit, then process the request using shared logic
+        intent = await run_llm(detect_intent, request.message, conversation_history=conversation_history or [])
+        result = await asyncio.to_thread(_process_chat_request, request.message, vector_store, intent)
         
         # Handle non-LLM responses (inventory, capabilities, errors, greetings)
         if not result["requires_llm"]:
@@ -372,21 +373,21 @@ async def chat_query_stream(
             focus_filenames=result["focus_filenames"],
         )
         
-        def event_stream():
+        async def event_stream():
             # Collect full response for logging
             full_response = ""
-            # Wrap OpenAI stream as SSE data events
-            for token in Streaming.chat_stream(messages):
+            # Wrap OpenAI stream as SSE data events; the LLM slot is held until the stream ends
+            async for token in stream_llm(Streaming.chat_stream, messages):
                 full_response += token
                 yield f"data: {token}\n\n"
             
             # DEBUG: Log raw content from streaming before any processing
-            import sys
-            newline_char = '\n'
-            crlf = '\r\n'
-            has_newline = newline_char in full_response
-            has_crlf = crlf in full_response
-            debug_msg = f"""
+            if logger.isEnabledFor(logging.DEBUG):
+                newline_char = '\n'
+                crlf = '\r\n'
+                has_newline = newline_char in full_response
+                has_crlf = crlf in full_response
+                debug_msg = f"""
 {'=' * 80}
 LLM RAW (from streaming endpoint, before any processing):
 {'=' * 80}
@@ -398,9 +399,7 @@ Contains \\n: {has_newline}
 Contains \\r\\n: {has_crlf}
 {'=' * 80}
 """
-            logger.info(debug_msg)
-            print(debug_msg, file=sys.stderr)  # Print to stderr for visibility
-            sys.stderr.flush()  # Force flush
+                logger.debug(debug_msg)
             
             # Log the raw LLM output after streaming completes (legacy log)
             logger.info("=" * 80)
@@ -514,7 +513,7 @@ async def get_conversation_starters(
     Get conversation starter prompts based on available documents.
     """
     try:
-        stats = vector_store.get_collection_stats()
+        stats = await asyncio.to_thread(vector_store.get_collection_stats)
         
         starters = [
             f"I have {stats['total_chunks']} document sections available. What would you like to know?",
@@ -1,9 +1,11 @@
 """Document management API endpoints."""
 from fastapi import APIRouter, HTTPException, BackgroundTasks, Query, UploadFile, File, Depends
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
 from pydantic import BaseModel
+from pydantic_core import to_json
 from typing import List, Dict, Any, Optional
 from datetime import datetime
+import asyncio
 import logging
 import os
 import tempfile
@@ -14,38 +16,41 @@ from app.config import settings
 from app.services.document_processor import DocumentProcessor
 from app.services.vector_store import VectorStore
 from app.services.llm_engine import LLMEngine
+from app.services.rate_limit import run_llm
 from app.dependencies import get_vector_store
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
+def _json_response(payload: Dict[str, Any]) -> Response:
+    """Serialize a large listing payload straight to JSON bytes, skipping jsonable_encoder."""
+    return Response(content=to_json(payload), media_type="application/json")
+
+
 @router.get("/list")
 async def list_documents(
     folder_path: Optional[str] = Query(None, description="(deprecated) SharePoint folder path"),
     vector_store: VectorStore = Depends(get_vector_store)
-) -> Dict[str, Any]:
+) -> Response:
     """List all documents known to the local vector store (SharePoint removed)."""
     try:
-        all_docs = vector_store.collection.get(limit=1000, include=['metadatas'])
-        unique_files = {}
-        for md in all_docs.get('metadatas') or []:
-            name = md.get('file_name', 'Unknown')
-            if name not in unique_files:
-                unique_files[name] = {
-                    "name": name,
-                    "file_path": md.get('file_path', ''),
-                    "time_modified": md.get('time_modified', ''),
-                    "author": md.get('author', 'Unknown'),
-                    "chunk_count": 1
-                }
-            else:
-                unique_files[name]["chunk_count"] += 1
-        return {
+        # One entry per file from the incrementally maintained per-file summary
+        files = [
+            {
+                "name": f["filename"],
+                "file_path": f["file_path"],
+                "time_modified": f["time_modified"],
+                "author": f["author"],
+                "chunk_count": f["chunk_count"]
+            }
+            for f in await asyncio.to_thread(vector_store.list_files)
+        ]
+        return _json_response({
             "status": "success",
-            "files": list(unique_files.values()),
-            "total_count": len(unique_files)
-        }
+            "files": files,
+            "total_count": len(files)
+        })
     except Exception as e:
         logger.error(f"Failed to list documents, error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to list documents: {str(e)}")
@@ -59,7 +64,7 @@ async def search_documents(
 ) -> Dict[str, Any]:
     """Search documents using vector similarity."""
     try:
-        results = vector_store.hybrid_search(query, n_results=n_results)
+        results = await asyncio.to_thread(vector_store.hybrid_search, query, n_results=n_results)
         
         return {
             "status": "success",
@@ -80,7 +85,7 @@ async def get_document_info(
 ) -> Dict[str, Any]:
     """Get detailed information about a specific document from local vector store."""
     try:
-        chunks = vector_store.search_by_file(file_name)
+        chunks = await asyncio.to_thread(vector_store.search_by_file, file_name)
         if not chunks:
             raise HTTPException(status_code=404, detail=f"Document '{file_name}' not found in vector database")
         md = chunks[0]['metadata'] if chunks else {}
@@ -108,16 +113,16 @@ async def get_document_summary(
 ) -> Dict[str, Any]:
     """Get AI-generated summary of a document using GPT-4o."""
     try:
-        chunks = vector_store.search_by_file(file_name)
+        chunks = await asyncio.to_thread(vector_store.search_by_file, file_name)
         
         if not chunks:
             raise HTTPException(status_code=404, detail=f"Document '{file_name}' not found")
         
         # Reconstruct text from chunks
-        full_text = "\n\n".join([c.get("content", "") for c in chunks[:10]])
+        full_text = "\n\n".join(c.get("content", "") for c in chunks[:10])
         
         # Generate summary using LLMEngine
-        summary = LLMEngine.summarize_text(file_name, full_text, max_words=100)
+        summary = await run_llm(LLMEngine.summarize_text, file_name, full_text, max_words=100)
         
         return {
             "status": "success",
@@ -133,41 +138,26 @@ async def get_document_summary(
         raise HTTPException(status_code=500, detail=f"Summary generation failed: {str(e)}")
 
 
-@router.post("/sync")
-async def sync_documents(
-    background_tasks: BackgroundTasks,
-    force_refresh: bool = Query(False, description="(deprecated) Force refresh of all documents")
-) -> Dict[str, Any]:
-    """SharePoint sync removed; endpoint retained for compatibility."""
-    return {
-        "status": "success",
-        "message": "SharePoint synchronization is disabled in this build. Use local upload.",
-        "force_refresh": False
-    }
-
+if settings.enable_legacy_sharepoint_routes:
+    @router.post("/sync")
+    async def sync_documents(
+        force_refresh: bool = Query(False, description="(deprecated) Force refresh of all documents")
+    ) -> Dict[str, Any]:
+        """SharePoint sync removed; endpoint retained for compatibility."""
+        return {
+            "status": "success",
+            "message": "SharePoint synchronization is disabled in this build. Use local upload.",
+            "force_refresh": False
+        }
 
-@router.post("/{file_name}/process")
-async def process_document(
-    file_name: str,
-    background_tasks: BackgroundTasks
-) -> Dict[str, Any]:
-    """Process a specific document and add to vector database."""
-    try:
-        # Start background processing
-        background_tasks.add_task(
-            _process_document_background,
-            file_name=file_name
-        )
-        
+    @router.post("/{file_name}/process")
+    async def process_document(file_name: str) -> Dict[str, Any]:
+        """SharePoint processing removed; endpoint retained for compatibility."""
         return {
             "status": "success",
-            "message": f"Processing '{file_name}' started in background",
+            "message": "SharePoint processing is disabled in this build. Use local upload.",
             "file_name": file_name
         }
-        
-    except Exception as e:
-        logger.error(f"Failed to start document processing, file_name: {file_name, error: {str(e)}}")
-        raise HTTPException(status_code=500, detail=f"Failed to process document: {str(e)}")
 
 
 @router.delete("/{file_name}")
@@ -182,7 +172,7 @@ async def delete_document_from_vector_store(
         decoded_file_name = unquote(file_name)
         
         logger.info(f"Attempting to delete document: {decoded_file_name} (original: {file_name})")
-        deleted_count = vector_store.delete_document_chunks(decoded_file_name)
+        deleted_count = await asyncio.to_thread(vector_store.delete_document_chunks, decoded_file_name)
         
         if deleted_count == 0:
             raise HTTPException(status_code=404, detail=f"Document '{decoded_file_name}' not found in vector database")
@@ -232,8 +222,11 @@ async def rename_document(
             )
         
         # Check if new name already exists
-        existing = vector_store.collection.get(
-            where={"file_name": new_name}
+        existing = await asyncio.to_thread(
+            vector_store.collection.get,
+            where={"file_name": new_name},
+            limit=1,
+            include=[]
         )
         if existing.get('ids') and len(existing['ids']) > 0:
             raise HTTPException(
@@ -242,8 +235,11 @@ async def rename_document(
             )
         
         # Check if old file exists
-        old_file = vector_store.collection.get(
-            where={"file_name": decoded_file_name}
+        old_file = await asyncio.to_thread(
+            vector_store.collection.get,
+            where={"file_name": decoded_file_name},
+            limit=1,
+            include=[]
         )
         if not old_file.get('ids') or len(old_file['ids']) == 0:
             raise HTTPException(
@@ -252,7 +248,7 @@ async def rename_document(
             )
         
         logger.info(f"Attempting to rename document: {decoded_file_name} -> {new_name}")
-        updated_count = vector_store.rename_document(decoded_file_name, new_name)
+        updated_count = await asyncio.to_thread(vector_store.rename_document, decoded_file_name, new_name)
         
         if updated_count == 0:
             raise HTTPException(
@@ -282,7 +278,7 @@ async def get_document_stats(
 ) -> Dict[str, Any]:
     """Get statistics about the document collection (SharePoint removed)."""
     try:
-        stats = vector_store.get_collection_stats()
+        stats = await asyncio.to_thread(vector_store.get_collection_stats)
         
         # SharePoint stats removed
         stats["sharepoint"] = {
@@ -307,27 +303,15 @@ async def get_simple_stats(
 ) -> Dict[str, Any]:
     """Get simple document statistics without SharePoint dependency."""
     try:
-        
-        # Get all documents from vector store
-        all_docs = vector_store.collection.get(
-            limit=1000,
-            include=['metadatas']
-        )
-        
-        # Count unique documents
-        unique_files = set()
-        for metadata in all_docs['metadatas']:
-            if metadata and 'file_name' in metadata:
-                unique_files.add(metadata['file_name'])
-        
-        # Count total chunks
-        total_chunks = len(all_docs['metadatas']) if all_docs['metadatas'] else 0
+        # Per-file summary is maintained incrementally, so no chunk metadata is fetched
+        summary = await asyncio.to_thread(vector_store.index_summary)
+        unique_files = list(dict.fromkeys(doc["filename"] for doc in summary["documents"]))
         
         return {
             "status": "success",
             "document_count": len(unique_files),
-            "chunk_count": total_chunks,
-            "files": list(unique_files)
+            "chunk_count": summary["total_chunks"],
+            "files": unique_files
         }
         
     except Exception as e:
@@ -346,7 +330,7 @@ async def reset_documents_index(
 ) -> Dict[str, Any]:
     """Clear all indexed files and reset counters (vector store recreation)."""
     try:
-        result = vector_store.reset_store()
+        result = await asyncio.to_thread(vector_store.reset_store)
         return {
             "status": "success",
             "message": "Vector store reset successfully",
@@ -382,7 +366,7 @@ async def upload_document(
         # Check duplicates ONLY in vector store ("in memory"); allow overwriting disk file if not in memory
         file_path = uploads_dir / file.filename
         try:
-            existing = vector_store.collection.get(where={"file_name": file.filename}, include=["ids"])
+            existing = await asyncio.to_thread(vector_store.collection.get, where={"file_name": file.filename}, limit=1, include=[])
             if existing and existing.get("ids"):
                 return {
                     "status": "exists",
@@ -425,8 +409,11 @@ async def upload_document(
         # Generate quick LLM summary (<50 words) from raw text for UI feedback
         try:
             processor = DocumentProcessor(vector_store)
-            extracted_text = processor.extract_text(file_content, file.filename)
-            short_summary = LLMEngine.summarize_text(file.filename, extracted_text, max_words=50) if extracted_text else ""
+            extracted_text = await asyncio.to_thread(processor.extract_text, file_content, file.filename)
+            short_summary = (
+                await run_llm(LLMEngine.summarize_text, file.filename, extracted_text, max_words=50)
+                if extracted_text else ""
+            )
         except Exception:
             short_summary = ""
         
@@ -449,41 +436,32 @@ async def upload_document(
 @router.get("/local")
 async def list_local_documents(
     vector_store: VectorStore = Depends(get_vector_store)
-) -> Dict[str, Any]:
+) -> Response:
     """List all locally uploaded documents."""
     try:
-        
-        # Get all documents and filter for local ones
-        all_docs = vector_store.collection.get(
-            limit=1000,
-            include=['metadatas', 'documents']
-        )
-        
-        # Filter for local/uploaded documents and group by file name
+        # Per-file summary shared with /list; keep locally uploaded files
+        files = await asyncio.to_thread(vector_store.list_files)
         unique_docs = {}
-        for i, metadata in enumerate(all_docs['metadatas']):
-            file_path = metadata.get('file_path', '')
-            server_url = metadata.get('server_relative_url', '')
+        for f in files:
+            file_path = f["file_path"]
             # Accept both old /local/ format and new /uploads/ format
-            if file_path.startswith('/local/') or server_url.startswith('/uploads/') or 'uploads' in file_path:
-                file_name = metadata.get('file_name', 'Unknown')
-                if file_name not in unique_docs:
-                    unique_docs[file_name] = {
-                        "name": file_name,
-                        "file_path": metadata.get('file_path', file_path),
-                        "time_last_modified": metadata.get('time_last_modified', metadata.get('time_modified', '')),
-                        "author": metadata.get('author', 'Unknown'),
-                        "file_size": metadata.get('file_size', 0),
-                        "chunk_count": 1
-                    }
-                else:
-                    unique_docs[file_name]["chunk_count"] += 1
+            if file_path.startswith('/local/') or f["server_relative_url"].startswith('/uploads/') or 'uploads' in file_path:
+                unique_docs[f["filename"]] = {
+                    "name": f["filename"],
+                    "file_path": file_path,
+                    "time_last_modified": (
+                        f["time_last_modified"] if f["time_last_modified"] is not None else f["time_modified"]
+                    ),
+                    "author": f["author"],
+                    "file_size": f["file_size"],
+                    "chunk_count": f["chunk_count"]
+                }
         
-        return {
+        return _json_response({
             "status": "success",
             "files": list(unique_docs.values()),
             "total_count": len(unique_docs)
-        }
+        })
         
     except Exception as e:
         logger.error(f"Failed to list local documents, error: {str(e)}")
@@ -511,7 +489,7 @@ async def download_document(
         
         if not file_path.exists():
             # Try to get file_path from vector store metadata
-            chunks = vector_store.search_by_file(decoded_file_name)
+            chunks = await asyncio.to_thread(vector_store.search_by_file, decoded_file_name)
             if chunks and chunks[0].get('metadata', {}).get('file_path'):
                 metadata_path = chunks[0]['metadata']['file_path']
                 # Handle both absolute and relative paths
@@ -551,16 +529,6 @@ async def download_document(
 
 
 # Background task functions
-async def _sync_documents_background(force_refresh: bool = False):
-    """No-op: SharePoint sync removed."""
-    logger.info("_sync_documents_background called, but SharePoint is disabled.")
-
-
-async def _process_document_background(file_name: str):
-    """Background task to process a specific document."""
-    logger.info(f"_process_document_background called for {file_name}, but SharePoint is disabled.")
-
-
 async def _process_uploaded_document_background(file_content: bytes, file_info: Dict[str, Any], vector_store: VectorStore):
     """Background task to process an uploaded document."""
     try:
@@ -568,8 +536,8 @@ async def _process_uploaded_document_background(file_content: bytes, file_info:
         
         document_processor = DocumentProcessor(vector_store)
         
-        # Process the document
-        result = document_processor.process_document(file_content, file_info)
+        # Process the document (parsing, chunking and embedding block, so off the event loop)
+        result = await asyncio.to_thread(document_processor.process_document, file_content, file_info)
         
         logger.info(f"Uploaded document processing completed, file_name: {file_info['name']}, result: {result['status']}")
         
@@ -1,6 +1,7 @@
 """Health check API endpoints."""
 from fastapi import APIRouter, Depends
 from typing import Dict, Any
+import asyncio
 import logging
 
 from app.services.vector_store import VectorStore
@@ -35,7 +36,7 @@ async def detailed_health_check(
     try:
         # Check vector store
         try:
-            stats = vector_store.get_collection_stats()
+            stats = await asyncio.to_thread(vector_store.get_collection_stats)
             health_status["checks"]["vector_store"] = {
                 "status": "healthy",
                 "stats": stats
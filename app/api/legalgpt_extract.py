@@ -2,19 +2,57 @@
 from fastapi import APIRouter, HTTPException, UploadFile, File, Depends
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
-import io
+from typing import List, Dict, Any, Optional, Tuple
+import asyncio
 import csv
+import hashlib
 import logging
 
+from app.services.cache import TTLCache
 from app.services.vector_store import VectorStore
 from app.services.document_processor import DocumentProcessor
 from app.services.llm_engine import LLMEngine
+from app.services.rate_limit import run_llm
 from app.dependencies import get_vector_store
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Batching settings for LLM extraction
+EXTRACT_BATCH_SIZE = 5  # Files per batched extraction request (amortizes prompt overhead)
+
+# Extraction results keyed by SHA-256 of the uploaded bytes, so re-uploads skip the LLM
+_extract_cache = TTLCache(capacity=1024, ttl=86400)
+
+EXPORT_BATCH_ROWS = 500  # rows encoded per streamed CSV chunk
+
+# Substrings of lowercased field names used to fill the row columns
+_COLUMN_NEEDLES = ("counterparty", "effective date", "expiration", "renewal", "payment")
+
+# Reconstructed texts keyed by filename, tagged with the index version they were built at;
+# a small bound since each entry holds a whole document
+_reconstructed_texts = TTLCache(capacity=16, ttl=3600)
+
+
+def _reconstruct_text(vector_store: VectorStore, filename: str, version: int) -> Tuple[str, int]:
+    """
+    Rebuild a file's full text from its chunks, ordered by chunk_index.
+    
+    Memoized per filename; an entry built at an older index version is replaced,
+    since the version changes on any write to the store.
+    
+    Returns:
+        Tuple of (full_text, chunk_count)
+    """
+    cached = _reconstructed_texts.get(filename)
+    if cached is not None and cached[0] == version:
+        return cached[1], cached[2]
+    # search_by_file already returns chunks in chunk_index order
+    chunks = vector_store.search_by_file(filename)
+    full_text = "\n\n".join(c.get("content", "") for c in chunks)
+    _reconstructed_texts.set(filename, (version, full_text, len(chunks)))
+    return full_text, len(chunks)
+
 
 class ExtractFromMemoryRequest(BaseModel):
     """Request to extract terms from a file already in memory."""
@@ -30,13 +68,63 @@ async def extract_from_files(
     try:
         processor = DocumentProcessor(vector_store)
 
-        rows: List[Dict[str, Any]] = []
-        for up in files:
-            content = await up.read()
+        def hash_and_extract(up: UploadFile) -> Tuple[str, str]:
+            up.file.seek(0)
+            hasher = hashlib.sha256()
+            for block in iter(lambda: up.file.read(1 << 20), b""):
+                hasher.update(block)
+            return hasher.hexdigest(), processor.extract_text_stream(up.file, up.filename)
+
+        async def read_one(up: UploadFile) -> Tuple[Optional[str], Optional[str]]:
+            # Parse straight from the upload's spooled temp file (no full in-memory copy),
+            # in a worker thread since hashing and PDF/Word parsing are CPU-bound
             try:
-                text = processor.extract_text(content, up.filename)
+                return await asyncio.to_thread(hash_and_extract, up)
             except Exception as e:  # noqa: BLE001
                 logger.error(f"Text extract failed for {up.filename}: {e}")
+                return None, None
+
+        results = await asyncio.gather(*(read_one(up) for up in files))
+        digests = [digest for digest, _ in results]
+        texts = [text for _, text in results]
+
+        # Reuse cached results for previously seen content; send each new digest to the LLM once
+        items_by_index: Dict[int, List[Dict[str, Any]]] = {}
+        pending: Dict[str, List[int]] = {}
+        for i, text in enumerate(texts):
+            if text is None:
+                continue
+            cached_items = _extract_cache.get(digests[i])
+            if cached_items is not None:
+                items_by_index[i] = cached_items
+            else:
+                pending.setdefault(digests[i], []).append(i)
+
+        # Batch new files into multi-document LLM calls; batches run concurrently
+        to_extract = [indices[0] for indices in pending.values()]
+        batches = [to_extract[i:i + EXTRACT_BATCH_SIZE] for i in range(0, len(to_extract), EXTRACT_BATCH_SIZE)]
+
+        async def extract_batch(indices: List[int]) -> Optional[List[List[Dict[str, Any]]]]:
+            docs: List[Tuple[str, str]] = [(files[i].filename, texts[i]) for i in indices]
+            try:
+                return await run_llm(LLMEngine.extract_terms_multi, docs)
+            except Exception as e:  # noqa: BLE001
+                logger.error(f"LLM extract failed for {[name for name, _ in docs]}: {e}")
+                return None
+
+        for indices, batch_items in zip(batches, await asyncio.gather(*(extract_batch(b) for b in batches))):
+            if batch_items is None:
+                continue
+            for i, items in zip(indices, batch_items):
+                # An empty list may be a parse failure or a document the model skipped; retry it next time
+                if items:
+                    _extract_cache.set(digests[i], items)
+                for j in pending[digests[i]]:
+                    items_by_index[j] = items
+
+        rows: List[Dict[str, Any]] = []
+        for i, up in enumerate(files):
+            if texts[i] is None:
                 rows.append({
                     "filename": up.filename,
                     "counterparty": "",
@@ -47,26 +135,23 @@ async def extract_from_files(
                 })
                 continue
 
-            # Invoke LLM clause extraction
-            items = []
-            try:
-                items = LLMEngine.extract_terms(text)
-            except Exception as e:  # noqa: BLE001
-                logger.error(f"LLM extract failed for {up.filename}: {e}")
-
-            # Map to expected columns (best-effort)
-            def find_field(name: str) -> str:
-                for it in items:
-                    if it.get("field") and name.lower() in it["field"].lower():
-                        return str(it.get("value", ""))
-                return ""
+            # Map to expected columns (best-effort) in one pass over the terms:
+            # each needle takes the value of the first field name containing it
+            matched: Dict[str, str] = {}
+            for it in items_by_index.get(i, []):
+                if not it.get("field"):
+                    continue
+                field = it["field"].lower()
+                for needle in _COLUMN_NEEDLES:
+                    if needle not in matched and needle in field:
+                        matched[needle] = str(it.get("value", ""))
 
             rows.append({
                 "filename": up.filename,
-                "counterparty": find_field("counterparty"),
-                "effective_date": find_field("effective date"),
-                "expiration_or_renewal": find_field("expiration") or find_field("renewal"),
-                "payment_terms": find_field("payment"),
+                "counterparty": matched.get("counterparty", ""),
+                "effective_date": matched.get("effective date", ""),
+                "expiration_or_renewal": matched.get("expiration") or matched.get("renewal", ""),
+                "payment_terms": matched.get("payment", ""),
                 "status": "Success",
             })
 
@@ -85,43 +170,38 @@ async def extract_from_memory(
     """Extract key terms from a file already indexed in vector store."""
     try:
         
-        # Get all chunks for this file
-        chunks = vector_store.search_by_file(request.filename)
-        if not chunks:
+        # Reconstruct full text from chunks (cached until the index changes)
+        full_text, chunks_count = await asyncio.to_thread(_reconstruct_text, vector_store, request.filename, vector_store.version())
+        if not chunks_count:
             raise HTTPException(status_code=404, detail=f"File '{request.filename}' not found in memory")
         
-        # Reconstruct full text from chunks (sorted by chunk_index if available)
-        def get_chunk_index(chunk):
-            md = chunk.get("metadata", {})
-            return md.get("chunk_index", 0)
-        
-        chunks_sorted = sorted(chunks, key=get_chunk_index)
-        full_text = "\n\n".join([c.get("content", "") for c in chunks_sorted])
-        
         logger.info(f"Extracting terms from {request.filename}, text length: {len(full_text)}")
         
-        # Extract key terms using GPT-4o with improved prompt
-        terms = LLMEngine.extract_terms(full_text, expected_fields=[
+        # Extract key terms and analyze sentiment concurrently; the sentiment
+        # prompt works from the contract text alone so neither waits on the other
+        terms_task = run_llm(LLMEngine.extract_terms, full_text, expected_fields=[
             "parties", "counterparty", "effective_date", "expiration_date", 
             "renewal_terms", "termination_clause", "payment_terms", 
             "governing_law", "confidentiality", "liability_cap", "indemnification"
         ])
+        sentiment_task = run_llm(LLMEngine.analyze_contract_sentiment, full_text, None)
+        terms, sentiment = await asyncio.gather(terms_task, sentiment_task, return_exceptions=True)
+        if isinstance(terms, BaseException):
+            raise terms
         
-        # Analyze contract sentiment
-        sentiment = None
-        try:
-            sentiment = LLMEngine.analyze_contract_sentiment(full_text, terms)
-            logger.info(f"Sentiment analysis completed: score={sentiment.get('score')}, label={sentiment.get('label')}")
-        except Exception as e:
-            logger.warning(f"Sentiment analysis failed: {e}")
+        if isinstance(sentiment, BaseException):
+            logger.warning(f"Sentiment analysis failed: {sentiment}")
             # Continue without sentiment if analysis fails
+            sentiment = None
+        elif sentiment:
+            logger.info(f"Sentiment analysis completed: score={sentiment.get('score')}, label={sentiment.get('label')}")
         
         response = {
             "status": "success",
             "filename": request.filename,
             "terms": terms,
             "text_length": len(full_text),
-            "chunks_count": len(chunks)
+            "chunks_count": chunks_count
         }
         
         if sentiment:
@@ -142,15 +222,8 @@ async def list_files_in_memory(
 ) -> Dict[str, Any]:
     """List all files available for extraction (indexed in vector store)."""
     try:
-        all_docs = vector_store.collection.get(limit=1000, include=['metadatas'])
-        
-        # Get unique filenames
-        unique_files = set()
-        for metadata in all_docs.get('metadatas', []):
-            if metadata and 'file_name' in metadata:
-                unique_files.add(metadata['file_name'])
-        
-        files = sorted(list(unique_files))
+        # Served from the store's incrementally maintained per-file summary
+        files = await asyncio.to_thread(vector_store.list_filenames)
         
         return {
             "status": "success",
@@ -163,6 +236,13 @@ async def list_files_in_memory(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+class _Echo:
+    """File-like object whose write() returns the value, so csv writers yield formatted lines."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
 class ExportRequest(BaseModel):
     """Request body for CSV export."""
     rows: List[Dict[str, Any]]
@@ -176,23 +256,30 @@ async def export_rows(request: ExportRequest) -> StreamingResponse:
         if not rows:
             raise HTTPException(status_code=400, detail="No rows to export")
         
-        # Determine fieldnames dynamically from all rows
-        all_fieldnames = set()
-        for row in rows:
-            all_fieldnames.update(row.keys())
+        # Determine fieldnames dynamically from all rows (single pass)
+        all_fieldnames = set().union(*map(dict.keys, rows))
         
         # Always include filename first, then sort the rest
         fieldnames = ["filename"] + sorted([f for f in all_fieldnames if f != "filename"])
         
-        buffer = io.StringIO()
-        writer = csv.DictWriter(buffer, fieldnames=fieldnames, extrasaction='ignore')
-        writer.writeheader()
-        for r in rows:
-            writer.writerow(r)
-        buffer.seek(0)
+        # Stream rows as they are formatted instead of buffering the whole CSV
+        writer = csv.DictWriter(_Echo(), fieldnames=fieldnames, extrasaction='ignore')
+        
+        def generate():
+            # Encode batches of lines straight to UTF-8 bytes so the response
+            # layer passes them through as-is and sends fewer, larger chunks
+            batch = [writer.writeheader()]
+            for i, r in enumerate(rows, 1):
+                batch.append(writer.writerow(r))
+                if i % EXPORT_BATCH_ROWS == 0:
+                    yield "".join(batch).encode("utf-8")
+                    batch = []
+            if batch:
+                yield "".join(batch).encode("utf-8")
+        
         return StreamingResponse(
-            io.BytesIO(buffer.getvalue().encode("utf-8")),
-            media_type="text/csv",
+            generate(),
+            media_type="text/csv; charset=utf-8",
             headers={"Content-Disposition": "attachment; filename=extraction_results.csv"},
         )
     except HTTPException:
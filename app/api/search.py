@@ -3,25 +3,79 @@ Search API endpoint with clause-level hybrid search and AI summaries.
 
 Returns clause-centric results grouped by file, with optional per-clause summaries.
 """
+import asyncio
+import functools
+import hashlib
 import logging
-from fastapi import APIRouter, HTTPException, Depends
+import string
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends, Request
+from fastapi.responses import Response
 from pydantic import BaseModel, Field
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import time
-from collections import defaultdict
+import numpy as np
 
 from app.services import search_query
+from app.services.cache import TTLCache, get_shared_cache
 from app.services.llm_engine import LLMEngine
-from app.services.vector_store import VectorStore
+from app.services.rate_limit import run_llm
+from app.services.vector_store import VectorStore, index_version
 from app.dependencies import get_vector_store
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# Simple in-memory cache (query -> (results, summary, timestamp))
-_cache = {}
 CACHE_TTL = 600  # 10 minutes
+CACHE_STALE_GRACE = 300  # Serve expired entries this much longer while refreshing in the background
+CACHE_MAX_ENTRIES = 256
+SEMANTIC_CACHE_THRESHOLD = 0.92  # Cosine similarity at which a paraphrased query reuses a cached result
+
+
+# In-memory search cache (query -> (SearchResponse, normalized query embedding, JSON body bytes))
+_cache = TTLCache(CACHE_MAX_ENTRIES, CACHE_TTL, stale_grace=CACHE_STALE_GRACE)
+
+# Rendered /status body as (monotonic timestamp, index version, JSON bytes)
+STATUS_CACHE_TTL = 5  # seconds
+_status_cache: Optional[Tuple[float, int, bytes]] = None
+
+# Searches currently being computed, keyed like _cache; duplicates await the same future
+_inflight: Dict[str, "asyncio.Future[SearchResponse]"] = {}
+
+
+@functools.lru_cache(maxsize=2048)
+def _normalize_query(query: str) -> str:
+    """Cache-key form of a query: lowercased, whitespace collapsed, surrounding punctuation stripped."""
+    return " ".join(query.lower().split()).strip(string.punctuation + " ")
+
+
+@functools.lru_cache(maxsize=2048)
+def _shared_cache_key(cache_key: str) -> str:
+    """Fixed-length Redis key for a local cache key."""
+    return "search:" + hashlib.blake2b(cache_key.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _normalize_embedding(embedding: List[float]) -> np.ndarray:
+    """Return the embedding as a unit-length float32 vector."""
+    vec = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+def _semantic_cache_lookup(query_vec: np.ndarray, params_suffix: str) -> Optional[Tuple[Any, ...]]:
+    """Find the cached search whose query embedding is most similar (>= threshold) with the same parameters."""
+    best_key, best_score = None, SEMANTIC_CACHE_THRESHOLD
+    for key, value in _cache.items():
+        if not key.endswith(params_suffix):
+            continue
+        score = float(np.dot(value[1], query_vec))
+        if score >= best_score:
+            best_key, best_score = key, score
+    if best_key is None:
+        return None
+    logger.info(f"Semantic cache hit (similarity={best_score:.3f}) for cached key: {best_key}")
+    return _cache.get(best_key)
+
 
 # ============================================================================
 # Request/Response Models
@@ -74,6 +128,328 @@ class IndexStatusResponse(BaseModel):
     total_chunks: int
     documents: List[IndexedDocument]
 
+
+async def _fill_clause_summaries(file_groups: List[Dict[str, Any]]) -> None:
+    """Generate the clause summaries search_and_group marked, one rate-limited LLM call per distinct clause."""
+    texts: Dict[str, str] = {}
+    for group in file_groups:
+        for clause in group.get("clauses", []):
+            if clause.get("_summary_key"):
+                texts.setdefault(clause["_summary_key"], clause.get("_original_content", ""))
+    if not texts:
+        return
+    
+    async def summarize(text: str) -> Optional[str]:
+        try:
+            return await run_llm(
+                LLMEngine.summarize_clause,
+                clause_text=text,
+                max_words=search_query.CLAUSE_SUMMARY_MAX_WORDS,
+            )
+        except Exception as e:
+            logger.warning(f"Failed to generate clause summary: {e}")
+            return None
+    
+    summaries = dict(zip(texts, await asyncio.gather(*(summarize(text) for text in texts.values()))))
+    for group in file_groups:
+        for clause in group.get("clauses", []):
+            if clause.get("_summary_key"):
+                clause["clause_summary"] = summaries[clause["_summary_key"]]
+
+
+async def _run_search(
+    request: SearchRequest,
+    vector_store: VectorStore,
+    cache_key: str,
+    shared_key: Optional[str],
+    query_vec: np.ndarray,
+    start_time: float,
+    background_tasks: Optional[BackgroundTasks] = None,
+) -> SearchResponse:
+    """
+    Run the clause search and summaries for a cache miss and store the response in both cache tiers.
+    
+    With ``background_tasks``, the shared-cache write and completion logging are deferred
+    until after the response has been sent.
+    """
+    # Perform clause-level search
+    logger.info(f"Starting clause-level search for query: '{request.query}'")
+    file_groups = await asyncio.to_thread(
+        search_query.search_and_group,
+        vector_store=vector_store,
+        query=request.query,
+        top_k_groups=request.top_k_groups,
+        max_snippets_per_group=request.max_snippets_per_group,
+        enable_clause_summaries=request.enable_clause_summaries
+    )
+    
+    logger.info(f"Search returned {len(file_groups)} file groups")
+    if not file_groups:
+        logger.warning(f"No groups found for query: '{request.query}' - check similarity threshold and vector store content")
+    
+    # Generate per-file keyword context summaries (REQUIRED for all files)
+    def chunks_for_summary(group: Dict[str, Any]) -> List[Dict[str, Any]]:
+        filename = group.get("filename", "Unknown")
+        
+        # Convert clauses to chunk format for LLM summary
+        # Use original content (before truncation) if available for better summaries
+        chunks = []
+        for clause in group.get("clauses", [])[:3]:  # Use top 3 clauses for context
+            # Prefer original content for summaries, fallback to truncated or snippet
+            clause_text = clause.get("_original_content") or clause.get("clause_text", "") or clause.get("clause_snippet", "")
+            if clause_text:
+                chunks.append({
+                    "content": clause_text,
+                    "metadata": {"file_name": filename}
+                })
+        if not chunks:
+            # Fallback if no clause text available
+            chunks = [{"content": f"Document: {filename}", "metadata": {"file_name": filename}}]
+        return chunks
+    
+    def apply_keyword_summary(group: Dict[str, Any], keyword_summary: str) -> None:
+        filename = group.get("filename", "Unknown")
+        # Log the generated summary for debugging
+        logger.info(f"Generated keyword summary for {filename}: {keyword_summary[:150]}...")
+        
+        # Only set if summary is not empty and not generic
+        if keyword_summary and keyword_summary.strip():
+            # Check if it's the generic fallback message
+            generic_phrases = [
+                "relevant content found",
+                "no relevant content",
+                "relevance to the query"
+            ]
+            is_generic = any(phrase in keyword_summary.lower() for phrase in generic_phrases)
+            
+            if is_generic:
+                # Still use it, but log the issue
+                logger.warning(f"Generated summary appears generic for {filename}: {keyword_summary[:100]}...")
+            group["keyword_summary"] = keyword_summary
+        else:
+            logger.error(f"Generated summary was empty for {filename}")
+            group["keyword_summary"] = f"Relevant content found for '{request.query}' in this document."
+    
+    async def fill_keyword_summary(group: Dict[str, Any]) -> None:
+        filename = group.get("filename", "Unknown")
+        # Generate AI summary for this file's keyword context
+        try:
+            # Use more words for better summaries (60 instead of 40)
+            keyword_summary = await run_llm(
+                LLMEngine.summarize_file_keyword_context,
+                filename=filename,
+                keyword=request.query,
+                chunks=chunks_for_summary(group),
+                max_words=60  # Increased from 40 for more detailed summaries
+            )
+            apply_keyword_summary(group, keyword_summary)
+        except Exception as e:
+            logger.error(f"Failed to generate keyword summary for {filename}: {e}", exc_info=True)
+            # Fallback summary only on exception
+            group["keyword_summary"] = f"Relevant content found for '{request.query}' in this document."
+    
+    # Flatten top clauses across groups as context for the overall summary
+    top_chunks = []
+    for g in file_groups[:request.top_k_groups]:
+        for clause in g.get("clauses", [])[:request.max_snippets_per_group]:
+            top_chunks.append({
+                "content": clause.get("clause_snippet", clause.get("clause_text", "")),
+                "metadata": {"file_name": g.get("filename", "Unknown")},
+            })
+    
+    async def generate_summaries(groups: List[Dict[str, Any]]) -> str:
+        """Fill per-file keyword summaries and return the overall summary."""
+        if not file_groups:
+            return "No matching clauses found."
+        # One combined LLM call for the overall summary and every file's summary;
+        # separate calls only for whatever it did not return
+        combined: Dict[str, Any] = {"overall": None, "per_file": {}}
+        if groups:
+            try:
+                combined = await run_llm(
+                    LLMEngine.summarize_all,
+                    request.query,
+                    {g.get("filename", "Unknown"): chunks_for_summary(g) for g in groups},
+                    top_chunks,
+                    max_words_overall=75,
+                    max_words_per_file=60,
+                )
+            except Exception as e:
+                logger.error(f"Combined summaries failed, falling back to separate calls: {e}")
+        missing = []
+        for g in groups:
+            keyword_summary = combined["per_file"].get(g.get("filename", "Unknown"))
+            if keyword_summary:
+                apply_keyword_summary(g, keyword_summary)
+            else:
+                missing.append(g)
+        
+        async def overall_summary() -> str:
+            if combined["overall"]:
+                return combined["overall"]
+            return await run_llm(LLMEngine.summarize, request.query, top_chunks, max_words=75)
+        
+        *_, overall = await asyncio.gather(*(fill_keyword_summary(g) for g in missing), overall_summary())
+        return overall
+    
+    groups_missing_summary = [
+        g for g in file_groups
+        if not g.get("keyword_summary") or not g.get("keyword_summary").strip()
+    ]
+    
+    async def summaries_or_error() -> Any:
+        try:
+            return await generate_summaries(groups_missing_summary)
+        except Exception as e:
+            return e
+    
+    # Clause summaries (if requested) run alongside the file and overall summaries
+    summary, _ = await asyncio.gather(summaries_or_error(), _fill_clause_summaries(file_groups))
+    # Calculate total matches once; it is stored on the cached response, so hits never recount
+    total_matches = sum(len(g.get("clauses", [])) for g in file_groups)
+    
+    # Per-file failures already fall back inside fill_keyword_summary; a failed
+    # overall summary degrades to a fallback and the response is not cached
+    cacheable = not isinstance(summary, BaseException)
+    if not cacheable:
+        logger.error(f"Failed to generate overall summary: {summary}")
+        summary = f"Found {total_matches} matching clauses for '{request.query}'."
+    
+    # Convert to response models. The dicts come from search_and_group, which already
+    # clamps scores to [0, 1], so skip per-field validation for every clause
+    file_results = []
+    for group in file_groups:
+        clause_hits = []
+        for clause_data in group.get("clauses", []):
+            clause_hits.append(ClauseHit.model_construct(
+                file_name=clause_data.get("file_name", group.get("filename", "Unknown")),
+                file_path=clause_data.get("file_path"),
+                section_title=clause_data.get("section_title"),
+                clause_text=clause_data.get("clause_text", ""),
+                clause_snippet=clause_data.get("clause_snippet", ""),
+                similarity_score=float(clause_data.get("similarity_score", 0.0)),
+                match_type=clause_data.get("match_type", "semantic"),
+                chunk_index=clause_data.get("chunk_index"),
+                clause_summary=clause_data.get("clause_summary"),
+                display_clause_score=clause_data.get("display_clause_score"),
+                clause_type=clause_data.get("clause_type")
+            ))
+        
+        # Ensure keyword_summary is always present
+        keyword_summary = group.get("keyword_summary", "")
+        if not keyword_summary or not keyword_summary.strip():
+            keyword_summary = f"Relevant content found for '{request.query}' in this document."
+        
+        file_results.append(FileSearchResult.model_construct(
+            file_name=group.get("filename", "Unknown"),
+            file_path=group.get("file_path"),
+            doc_score=float(group.get("doc_score", 0.0)),
+            keyword_summary=keyword_summary,
+            clauses=clause_hits
+        ))
+    
+    response = SearchResponse.model_construct(
+        overall_summary=summary,
+        total_matches=total_matches,
+        query=request.query,
+        files=file_results
+    )
+    
+    # Cache the response locally right away (LRU eviction keeps hot queries when full)
+    # so requests arriving after the in-flight entry is released still hit it
+    if cacheable:
+        _cache.set(cache_key, (response, query_vec, response.model_dump_json().encode("utf-8")))
+    
+    # Redis write and completion logging happen after the response is sent when possible
+    finish = functools.partial(
+        _finish_search, request.query, file_groups, time.time() - start_time,
+        shared_key if cacheable else None, response, query_vec,
+    )
+    if background_tasks is not None:
+        background_tasks.add_task(finish)
+    else:
+        await finish()
+    
+    return response
+
+
+async def _finish_search(
+    query: str,
+    file_groups: List[Dict[str, Any]],
+    elapsed: float,
+    shared_key: Optional[str],
+    response: SearchResponse,
+    query_vec: np.ndarray,
+) -> None:
+    """Log search completion and publish the response to the shared cache (if any)."""
+    total_matches = response.total_matches
+    logger.info(f"Search completed in {elapsed:.2f}s, found {len(file_groups)} file groups with {total_matches} total clauses")
+    
+    # Log final response details
+    if file_groups:
+        logger.info(f"Returning {len(file_groups)} file groups with {total_matches} total clause matches")
+        if logger.isEnabledFor(logging.DEBUG):
+            for i, group in enumerate(file_groups, 1):
+                logger.debug(f"  Group {i}: {group.get('filename')} - {len(group.get('clauses', []))} clauses, doc_score={group.get('doc_score', 0):.3f}")
+    else:
+        logger.warning(f"Returning empty results for query: '{query}'")
+    
+    shared_cache = get_shared_cache()
+    if shared_key is not None and shared_cache is not None:
+        await shared_cache.set(
+            shared_key,
+            {"response": response.model_dump(mode="json"), "query_vec": query_vec.tolist()},
+            ttl=CACHE_TTL,
+        )
+
+
+async def _search_coalesced(
+    request: SearchRequest,
+    vector_store: VectorStore,
+    cache_key: str,
+    shared_key: Optional[str],
+    query_vec: np.ndarray,
+    start_time: float,
+    background_tasks: Optional[BackgroundTasks] = None,
+) -> SearchResponse:
+    """Run _run_search, or join an identical search already in flight and share its result."""
+    inflight = _inflight.get(cache_key)
+    if inflight is not None:
+        logger.info(f"Joining in-flight search for query: {request.query}")
+        await asyncio.wait([inflight])
+        if not inflight.cancelled():
+            return inflight.result().model_copy(update={"query": request.query})
+    
+    future = asyncio.get_running_loop().create_future()
+    _inflight[cache_key] = future
+    try:
+        response = await _run_search(request, vector_store, cache_key, shared_key, query_vec, start_time, background_tasks)
+        future.set_result(response)
+        return response
+    except Exception as e:
+        future.set_exception(e)
+        future.exception()  # mark retrieved so it is not logged when nobody joined
+        raise
+    except BaseException:
+        future.cancel()
+        raise
+    finally:
+        if _inflight.get(cache_key) is future:
+            del _inflight[cache_key]
+
+
+async def _refresh_search(request: SearchRequest, vector_store: VectorStore, cache_key: str, shared_key: Optional[str]) -> None:
+    """Background task recomputing a stale cache entry; at most one refresh per key runs at a time."""
+    if cache_key in _inflight:
+        return
+    try:
+        query_vec = _normalize_embedding(await asyncio.to_thread(vector_store.embed_query, request.query))
+        await _search_coalesced(request, vector_store, cache_key, shared_key, query_vec, time.time())
+        logger.info(f"Refreshed stale cache entry for query: {request.query}")
+    except Exception as e:
+        logger.warning(f"Background refresh failed for query '{request.query}': {e}")
+
+
 # ============================================================================
 # API Endpoints
 # ============================================================================
@@ -81,7 +457,8 @@ class IndexStatusResponse(BaseModel):
 @router.post("/", response_model=SearchResponse)
 async def search_documents(
     request: SearchRequest,
-    vector_store: VectorStore = Depends(get_vector_store)
+    background_tasks: BackgroundTasks,
+    http_request: Request,
 ):
     """
     Clause-level hybrid search with grouped results and AI summaries.
@@ -93,176 +470,62 @@ async def search_documents(
     - Optional per-clause summaries (if enable_clause_summaries=True)
     
     Returns clause-centric results with rich metadata (file_path, section_title, etc.).
+    
+    The vector store is resolved only when the request misses the exact-match caches.
     """
     try:
         start_time = time.time()
         logger.info(f"Search request: query='{request.query}', top_k={request.top_k_groups}, clause_summaries={request.enable_clause_summaries}")
         
-        # Check cache
-        cache_key = f"{request.query}|{request.top_k_groups}|{request.max_snippets_per_group}|{request.enable_clause_summaries}"
-        if cache_key in _cache:
-            cached_results, cached_summary, cached_time = _cache[cache_key]
-            if time.time() - cached_time < CACHE_TTL:
-                logger.info(f"Cache hit for query: {request.query}")
-                return SearchResponse(
-                    overall_summary=cached_summary,
-                    total_matches=sum(len(f.get("clauses", [])) for f in cached_results),
-                    query=request.query,
-                    files=[FileSearchResult(**file_data) for file_data in cached_results]
+        # Check cache: exact key first, then semantically similar queries with the same parameters.
+        # Keys carry this worker's index version and, with Redis, the generation shared by all
+        # workers, so results from before a write made by any worker are never served
+        shared_cache = get_shared_cache()
+        generation = await shared_cache.get_generation() if shared_cache is not None else None
+        base_suffix = f"|{request.top_k_groups}|{request.max_snippets_per_group}|{request.enable_clause_summaries}"
+        params_suffix = f"{base_suffix}|v{index_version()}" + (f"|g{generation}" if generation is not None else "")
+        normalized_query = _normalize_query(request.query)
+        cache_key = f"{normalized_query}{params_suffix}"
+        shared_key = _shared_cache_key(f"{normalized_query}{base_suffix}|g{generation}") if generation is not None else None
+        stale_entry = _cache.get_stale(cache_key)
+        cached = None
+        if stale_entry is not None:
+            cached, is_stale = stale_entry
+            if is_stale:
+                # Serve the expired result now and recompute it after the response is sent
+                logger.info(f"Serving stale cache entry for query: {request.query}")
+                background_tasks.add_task(_refresh_search, request, get_vector_store(http_request), cache_key, shared_key)
+        if cached is None and shared_key is not None:
+            # Another worker may have computed this exact query already
+            shared = await shared_cache.get(shared_key)
+            if shared is not None:
+                shared_response = SearchResponse.model_validate(shared["response"])
+                cached = (
+                    shared_response,
+                    np.asarray(shared["query_vec"], dtype=np.float32),
+                    shared_response.model_dump_json().encode("utf-8"),
                 )
+                _cache.set(cache_key, cached)
+        query_vec = None
+        if cached is None:
+            vector_store = get_vector_store(http_request)
+            query_vec = _normalize_embedding(await asyncio.to_thread(vector_store.embed_query, request.query))
+            cached = _semantic_cache_lookup(query_vec, params_suffix)
+        if cached is not None:
+            cached_response, _, cached_body = cached
+            logger.info(f"Cache hit for query: {request.query}")
+            # Already built and serialized when cached; only re-serialize if the query text differs
+            if cached_response.query == request.query:
+                return Response(content=cached_body, media_type="application/json")
+            hit = cached_response.model_copy(update={"query": request.query})
+            return Response(content=hit.model_dump_json(), media_type="application/json")
         
-        # Perform clause-level search
-        logger.info(f"Starting clause-level search for query: '{request.query}'")
-        file_groups = search_query.search_and_group(
-            vector_store=vector_store,
-            query=request.query,
-            top_k_groups=request.top_k_groups,
-            max_snippets_per_group=request.max_snippets_per_group,
-            enable_clause_summaries=request.enable_clause_summaries
-        )
-        
-        logger.info(f"Search returned {len(file_groups)} file groups")
-        if not file_groups:
-            logger.warning(f"No groups found for query: '{request.query}' - check similarity threshold and vector store content")
-        
-        # Generate per-file keyword context summaries (REQUIRED for all files)
-        for group in file_groups:
-            filename = group.get("filename", "Unknown")
-            clauses = group.get("clauses", [])
-            
-            # Ensure keyword_summary exists (generate if missing)
-            if not group.get("keyword_summary") or not group.get("keyword_summary").strip():
-                # Convert clauses to chunk format for LLM summary
-                # Use original content (before truncation) if available for better summaries
-                chunks_for_summary = []
-                for clause in clauses[:3]:  # Use top 3 clauses for context
-                    # Prefer original content for summaries, fallback to truncated or snippet
-                    clause_text = clause.get("_original_content") or clause.get("clause_text", "") or clause.get("clause_snippet", "")
-                    if clause_text:
-                        chunks_for_summary.append({
-                            "content": clause_text,
-                            "metadata": {"file_name": filename}
-                        })
-                
-                # Generate AI summary for this file's keyword context
-                try:
-                    if chunks_for_summary:
-                        # Use more words for better summaries (60 instead of 40)
-                        keyword_summary = LLMEngine.summarize_file_keyword_context(
-                            filename=filename,
-                            keyword=request.query,
-                            chunks=chunks_for_summary,
-                            max_words=60  # Increased from 40 for more detailed summaries
-                        )
-                        # Log the generated summary for debugging
-                        logger.info(f"Generated keyword summary for {filename}: {keyword_summary[:150]}...")
-                    else:
-                        # Fallback if no clause text available
-                        keyword_summary = LLMEngine.summarize_file_keyword_context(
-                            filename=filename,
-                            keyword=request.query,
-                            chunks=[{"content": f"Document: {filename}", "metadata": {"file_name": filename}}],
-                            max_words=60
-                        )
-                    
-                    # Only set if summary is not empty and not generic
-                    if keyword_summary and keyword_summary.strip():
-                        # Check if it's the generic fallback message
-                        generic_phrases = [
-                            "relevant content found",
-                            "no relevant content",
-                            "relevance to the query"
-                        ]
-                        is_generic = any(phrase in keyword_summary.lower() for phrase in generic_phrases)
-                        
-                        if not is_generic:
-                            group["keyword_summary"] = keyword_summary
-                        else:
-                            logger.warning(f"Generated summary appears generic for {filename}: {keyword_summary[:100]}...")
-                            # Still use it, but log the issue
-                            group["keyword_summary"] = keyword_summary
-                    else:
-                        logger.error(f"Generated summary was empty for {filename}")
-                        group["keyword_summary"] = f"Relevant content found for '{request.query}' in this document."
-                except Exception as e:
-                    logger.error(f"Failed to generate keyword summary for {filename}: {e}", exc_info=True)
-                    # Fallback summary only on exception
-                    group["keyword_summary"] = f"Relevant content found for '{request.query}' in this document."
-        
-        # Generate overall summary via shared LLM
-        if file_groups:
-            # Flatten top clauses across groups for context
-            top_chunks = []
-            for g in file_groups[:request.top_k_groups]:
-                for clause in g.get("clauses", [])[:request.max_snippets_per_group]:
-                    top_chunks.append({
-                        "content": clause.get("clause_snippet", clause.get("clause_text", "")),
-                        "metadata": {"file_name": g.get("filename", "Unknown")},
-                    })
-            summary = LLMEngine.summarize(request.query, top_chunks, max_words=75)
-        else:
-            summary = "No matching clauses found."
-        
-        # Calculate total matches
-        total_matches = sum(len(g.get("clauses", [])) for g in file_groups)
-        
-        # Cache results
-        _cache[cache_key] = (file_groups, summary, time.time())
-        
-        # Clean old cache entries (simple cleanup)
-        if len(_cache) > 100:
-            _cache.clear()  # Simple approach: clear all when too large
-        
-        elapsed = time.time() - start_time
-        logger.info(f"Search completed in {elapsed:.2f}s, found {len(file_groups)} file groups with {total_matches} total clauses")
-        
-        # Log final response details
-        if file_groups:
-            logger.info(f"Returning {len(file_groups)} file groups with {total_matches} total clause matches")
-            for i, group in enumerate(file_groups, 1):
-                logger.debug(f"  Group {i}: {group.get('filename')} - {len(group.get('clauses', []))} clauses, doc_score={group.get('doc_score', 0):.3f}")
-        else:
-            logger.warning(f"Returning empty results for query: '{request.query}'")
-        
-        # Convert to response models
-        file_results = []
-        for group in file_groups:
-            clause_hits = []
-            for clause_data in group.get("clauses", []):
-                clause_hits.append(ClauseHit(
-                    file_name=clause_data.get("file_name", group.get("filename", "Unknown")),
-                    file_path=clause_data.get("file_path"),
-                    section_title=clause_data.get("section_title"),
-                    clause_text=clause_data.get("clause_text", ""),
-                    clause_snippet=clause_data.get("clause_snippet", ""),
-                    similarity_score=clause_data.get("similarity_score", 0.0),
-                    match_type=clause_data.get("match_type", "semantic"),
-                    chunk_index=clause_data.get("chunk_index"),
-                    clause_summary=clause_data.get("clause_summary"),
-                    display_clause_score=clause_data.get("display_clause_score"),
-                    clause_type=clause_data.get("clause_type")
-                ))
-            
-            # Ensure keyword_summary is always present
-            keyword_summary = group.get("keyword_summary", "")
-            if not keyword_summary or not keyword_summary.strip():
-                keyword_summary = f"Relevant content found for '{request.query}' in this document."
-            
-            file_results.append(FileSearchResult(
-                file_name=group.get("filename", "Unknown"),
-                file_path=group.get("file_path"),
-                doc_score=group.get("doc_score", 0.0),
-                keyword_summary=keyword_summary,
-                clauses=clause_hits
-            ))
-        
-        return SearchResponse(
-            overall_summary=summary,
-            total_matches=total_matches,
-            query=request.query,
-            files=file_results
-        )
+        response = await _search_coalesced(request, vector_store, cache_key, shared_key, query_vec, start_time, background_tasks)
+        # Serialize with pydantic's native encoder rather than FastAPI's re-validate + jsonable_encoder + json.dumps
+        return Response(content=response.model_dump_json(), media_type="application/json")
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Search failed: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
@@ -274,50 +537,37 @@ async def get_index_status(
     """
     Get the current status of the search index, including all indexed documents.
     """
+    global _status_cache
     try:
+        # Polled by the UI: reuse the rendered response briefly unless the index changed
+        version = vector_store.version()
+        if _status_cache is not None:
+            cached_at, cached_version, body = _status_cache
+            if cached_version == version and time.monotonic() - cached_at < STATUS_CACHE_TTL:
+                return Response(content=body, media_type="application/json")
         
-        # Get all documents from ChromaDB
-        all_docs = vector_store.collection.get(include=['metadatas'])
+        # Per-file chunk counts are maintained by the vector store; no metadata scan here
+        summary = await asyncio.to_thread(vector_store.index_summary)
         
-        if not all_docs.get('metadatas'):
-            return IndexStatusResponse(
+        if not summary["total_chunks"]:
+            response = IndexStatusResponse(
                 status="empty",
                 total_files=0,
                 total_chunks=0,
                 documents=[]
             )
+        else:
+            documents = [IndexedDocument(**doc) for doc in summary["documents"]]
+            response = IndexStatusResponse(
+                status="ready",
+                total_files=len(documents),
+                total_chunks=summary["total_chunks"],
+                documents=documents
+            )
         
-        # Group chunks by file
-        file_groups = defaultdict(list)
-        for metadata in all_docs['metadatas']:
-            file_name = metadata.get('file_name', 'Unknown')
-            file_id = metadata.get('file_id', file_name)
-            file_groups[(file_id, file_name)].append(metadata)
-        
-        # Build document list
-        documents = []
-        for (file_id, filename), file_metadatas in file_groups.items():
-            # Determine source based on metadata
-            source = "local"  # Default
-            if file_metadatas and "source" in file_metadatas[0]:
-                source = file_metadatas[0]["source"]
-            
-            documents.append(IndexedDocument(
-                file_id=file_id,
-                filename=filename,
-                chunk_count=len(file_metadatas),
-                source=source
-            ))
-        
-        # Sort by filename
-        documents.sort(key=lambda d: d.filename)
-        
-        return IndexStatusResponse(
-            status="ready",
-            total_files=len(documents),
-            total_chunks=len(all_docs['metadatas']),
-            documents=documents
-        )
+        body = response.model_dump_json().encode("utf-8")
+        _status_cache = (time.monotonic(), version, body)
+        return Response(content=body, media_type="application/json")
         
     except Exception as e:
         logger.error(f"Failed to get index status: {e}", exc_info=True)
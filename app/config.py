@@ -29,6 +29,10 @@ class Settings(BaseSettings):
         default="/Shared Documents/Legal Documents",
         description="Path to legal documents folder in Sharepoint"
     )
+    enable_legacy_sharepoint_routes: bool = Field(
+        default=False,
+        description="Register the deprecated SharePoint sync/process endpoints"
+    )
     
     # OpenAI Configuration (Optional for basic startup)
     openai_api_key: str = Field(
@@ -53,6 +57,10 @@ class Settings(BaseSettings):
         default="redis://localhost:6379/0",
         description="Redis URL for background tasks"
     )
+    enable_redis_cache: bool = Field(
+        default=False,
+        description="Share search result caches across workers via Redis at redis_url"
+    )
     
     # Application Configuration
     debug: bool = Field(default=True, description="Debug mode")
@@ -68,6 +76,20 @@ class Settings(BaseSettings):
         description="List of allowed origins for CORS"
     )
     
+    # LLM Configuration
+    llm_max_concurrency: int = Field(
+        default=10,
+        ge=1,
+        description="Maximum number of concurrent LLM provider calls across all endpoints"
+    )
+    
+    # Document Processing Configuration
+    pdf_extraction_workers: int = Field(
+        default=4,
+        ge=0,
+        description="Worker processes for extracting text from large PDFs in parallel; 0 extracts in-process"
+    )
+    
     # Search Configuration
     search_similarity_threshold: float = Field(
         default=0.3,
@@ -1,4 +1,10 @@
-"""FastAPI dependency injection functions."""
+"""
+FastAPI dependency injection functions.
+
+Services are created once per worker at startup (see ``app.main``) and shared.
+The VectorStore lives on ``app.state`` and is injected here; the LLM client is a
+module-level singleton in ``app.services.llm_engine`` preloaded via ``LLMEngine.preload``.
+"""
 from fastapi import Request, HTTPException
 from app.services.vector_store import VectorStore
 
@@ -4,16 +4,23 @@ LegalGPT - AI-Powered Legal Document Platform
 Main FastAPI application entry point with startup/shutdown lifecycle management.
 Provides REST API for document upload, search, chat, and contract extraction.
 """
+import asyncio
 import uvicorn
 from fastapi import FastAPI
+from fastapi.responses import HTMLResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 import logging
 
 from app.config import settings
 from app.api import router
+from app.services.cache import close_shared_cache, init_shared_cache
+from app.services.context_assembler import close_retrieval_executor
 from app.services.document_processor import DocumentProcessor
-from app.services.vector_store import VectorStore
+from app.services.http_client import close_http_client
+from app.services.llm_engine import LLMEngine
+from app.services.pdf_pages import close_pdf_executor
+from app.services.vector_store import VectorStore, add_index_change_listener
 
 # Configure logging
 logging.basicConfig(
@@ -55,6 +62,8 @@ async def startup_event():
     
     - Initializes ChromaDB vector store with OpenAI embeddings
     - Sets up document processor for file ingestion
+    - Creates the OpenAI client and warms its connection so the first request pays no setup cost
+    - Caches the landing page HTML served at /
     """
     logger.info("🚀 Starting LegalGPT Platform")
     
@@ -68,6 +77,23 @@ async def startup_event():
     app.state.document_processor = document_processor
     logger.info("✅ Document processor ready")
     
+    # Read the landing page once instead of on every request to /
+    with open("app/static/index.html", "rb") as f:
+        app.state.index_html = f.read()
+    
+    # Create the shared LLM client and open its connection pool
+    await asyncio.to_thread(LLMEngine.preload)
+    logger.info("✅ LLM engine ready")
+    
+    # Connect the cross-worker Redis cache (no-op unless ENABLE_REDIS_CACHE)
+    shared_cache = init_shared_cache()
+    if shared_cache is not None:
+        # Writes run in worker threads; bump the shared generation on this loop
+        loop = asyncio.get_running_loop()
+        add_index_change_listener(
+            lambda: asyncio.run_coroutine_threadsafe(shared_cache.bump_generation(), loop)
+        )
+    
     logger.info("🎉 LegalGPT ready at http://localhost:8000")
 
 
@@ -75,13 +101,16 @@ async def startup_event():
 async def shutdown_event():
     """Cleanup resources on application shutdown."""
     logger.info("👋 Shutting down LegalGPT")
+    await close_shared_cache()
+    close_http_client()
+    close_pdf_executor()
+    close_retrieval_executor()
 
 
-@app.get("/")
+@app.get("/", response_class=HTMLResponse)
 async def root():
-    """Root endpoint serving the web application."""
-    from fastapi.responses import FileResponse
-    return FileResponse("app/static/index.html")
+    """Root endpoint serving the web application (page read once at startup)."""
+    return HTMLResponse(app.state.index_html)
 
 
 @app.get("/health")
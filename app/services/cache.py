@@ -0,0 +1,162 @@
+"""In-process and Redis-backed caches shared by API handlers."""
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, List, Optional, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """
+    LRU cache with per-entry expiry; evicts least recently used entries when full. Thread-safe.
+
+    With ``stale_grace`` > 0, expired entries are kept that much longer so callers can
+    serve them via ``get_stale`` while refreshing; ``get`` never returns them.
+    """
+
+    def __init__(self, capacity: int, ttl: float, stale_grace: float = 0.0):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.stale_grace = stale_grace
+        self.store: OrderedDict[str, Tuple[float, Any]] = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self.get_stale(key)
+        if entry is None or entry[1]:
+            return None
+        return entry[0]
+
+    def get_stale(self, key: str) -> Optional[Tuple[Any, bool]]:
+        """Return (value, is_stale) for fresh or within-grace entries, else None."""
+        with self.lock:
+            entry = self.store.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            now = time.monotonic()
+            if now >= expires_at + self.stale_grace:
+                del self.store[key]
+                return None
+            self.store.move_to_end(key)
+            return value, now >= expires_at
+
+    def set(self, key: str, value: Any) -> None:
+        with self.lock:
+            self.store[key] = (time.monotonic() + self.ttl, value)
+            self.store.move_to_end(key)
+            while len(self.store) > self.capacity:
+                self.store.popitem(last=False)
+
+    def items(self) -> List[Tuple[str, Any]]:
+        """Snapshot of unexpired (key, value) pairs, oldest first; does not affect recency."""
+        now = time.monotonic()
+        with self.lock:
+            return [(key, value) for key, (expires_at, value) in self.store.items() if expires_at > now]
+
+
+# Redis counter incremented on every index write by any worker; shared cache keys include it
+INDEX_GENERATION_KEY = "index_generation"
+
+
+class RedisCache:
+    """
+    JSON cache shared across worker processes via Redis.
+
+    Every operation fails soft: Redis errors are logged and treated as misses, and
+    after a failure the cache stays disabled for ``retry_after`` seconds so an
+    unavailable server does not add a connection timeout to every request.
+    """
+
+    def __init__(self, url: str, prefix: str = "legalgpt:", max_connections: int = 20, retry_after: float = 30.0):
+        import redis.asyncio as redis_asyncio
+
+        self.prefix = prefix
+        self.retry_after = retry_after
+        self._disabled_until = 0.0
+        self._pool = redis_asyncio.ConnectionPool.from_url(url, max_connections=max_connections)
+        self._client = redis_asyncio.Redis(connection_pool=self._pool)
+
+    def _available(self) -> bool:
+        return time.monotonic() >= self._disabled_until
+
+    def _trip(self, op: str, error: Exception) -> None:
+        logger.warning(f"Redis cache {op} failed, disabling for {self.retry_after:.0f}s: {error}")
+        self._disabled_until = time.monotonic() + self.retry_after
+
+    async def get(self, key: str) -> Optional[Any]:
+        if not self._available():
+            return None
+        try:
+            raw = await self._client.get(self.prefix + key)
+        except Exception as e:  # noqa: BLE001
+            self._trip("get", e)
+            return None
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, key: str, value: Any, ttl: int) -> None:
+        if not self._available():
+            return
+        try:
+            await self._client.set(self.prefix + key, json.dumps(value), ex=ttl)
+        except Exception as e:  # noqa: BLE001
+            self._trip("set", e)
+
+    async def get_generation(self) -> Optional[int]:
+        """Return the shared index generation (0 if never bumped), or None while Redis is unavailable."""
+        if not self._available():
+            return None
+        try:
+            raw = await self._client.get(self.prefix + INDEX_GENERATION_KEY)
+        except Exception as e:  # noqa: BLE001
+            self._trip("get", e)
+            return None
+        return int(raw) if raw is not None else 0
+
+    async def bump_generation(self) -> None:
+        """Advance the shared index generation so every worker stops reading older entries."""
+        # Attempted even while tripped: a lost bump would let other workers serve stale entries
+        try:
+            await self._client.incr(self.prefix + INDEX_GENERATION_KEY)
+        except Exception as e:  # noqa: BLE001
+            self._trip("incr", e)
+
+    async def close(self) -> None:
+        await self._client.aclose()
+        await self._pool.disconnect()
+
+
+_shared_cache: Optional[RedisCache] = None
+
+
+def init_shared_cache() -> Optional[RedisCache]:
+    """Create the process-wide Redis cache if enabled in settings; called on app startup."""
+    global _shared_cache
+    if _shared_cache is None and settings.enable_redis_cache:
+        try:
+            _shared_cache = RedisCache(settings.redis_url)
+            logger.info("Shared Redis cache enabled")
+        except ImportError:
+            logger.warning("ENABLE_REDIS_CACHE is set but the redis package is not installed; using in-process caches only")
+    return _shared_cache
+
+
+def get_shared_cache() -> Optional[RedisCache]:
+    """Return the shared Redis cache, or None when running with in-process caches only."""
+    return _shared_cache
+
+
+async def close_shared_cache() -> None:
+    """Release Redis connections; called on app shutdown."""
+    global _shared_cache
+    if _shared_cache is not None:
+        await _shared_cache.close()
+        _shared_cache = None
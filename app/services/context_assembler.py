@@ -5,49 +5,37 @@ to support intent-aware prompting for Chat and Search.
 """
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from typing import Any, Dict, List, Optional, Tuple
+import heapq
 import logging
 import os
 import re
-import tiktoken
 
+from app.services.tokens import count_tokens_batch
 from app.services.vector_store import VectorStore
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
-# Token encoder for GPT-4o (cl100k_base encoding)
-_token_encoder = None
+# Runs the general hybrid search concurrently with inventory and targeted-file retrieval
+_retrieval_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="context-retrieval")
 
 
-def _get_token_encoder():
-    """Get or create the token encoder (singleton)."""
-    global _token_encoder
-    if _token_encoder is None:
-        _token_encoder = tiktoken.get_encoding("cl100k_base")
-    return _token_encoder
+def close_retrieval_executor() -> None:
+    """Stop the retrieval threads without waiting for queued searches; called on app shutdown."""
+    _retrieval_executor.shutdown(wait=False, cancel_futures=True)
 
 
-def _count_tokens(text: str) -> int:
-    """Count tokens in text using GPT-4o encoding."""
-    if not text:
-        return 0
-    try:
-        encoder = _get_token_encoder()
-        return len(encoder.encode(text))
-    except Exception as e:
-        logger.warning(f"Token counting failed: {e}, falling back to character estimate")
-        # Fallback: approximate 1 token = 4 characters
-        return len(text) // 4
-
-
-def _truncate_chunk_content(chunk: Dict[str, Any], max_chars: int = 1000) -> Dict[str, Any]:
+def _truncate_chunk_content(chunk: Dict[str, Any], max_chars: int = 1000, in_place: bool = False) -> Dict[str, Any]:
     """
     Truncate chunk content to max_chars while preserving structure.
     
     Args:
         chunk: Chunk dictionary with 'content' key
         max_chars: Maximum characters to keep
+        in_place: Update the caller-owned chunk instead of copying it
         
     Returns:
         Modified chunk with truncated content
@@ -62,7 +50,7 @@ def _truncate_chunk_content(chunk: Dict[str, Any], max_chars: int = 1000) -> Dic
     if last_space > max_chars * 0.9:  # If we're close to a word boundary
         truncated = truncated[:last_space]
     
-    result = chunk.copy()
+    result = chunk if in_place else chunk.copy()
     result["content"] = truncated + "..."
     return result
 
@@ -94,18 +82,15 @@ def _prioritize_and_limit_chunks(
             0.0
         )
     
-    sorted_chunks = sorted(chunks, key=get_score, reverse=True)
-    
-    # Limit by chunk count
-    limited = sorted_chunks[:max_chunks]
+    # Top max_chunks by score, in the same order a stable descending sort would give
+    limited = heapq.nlargest(max_chunks, chunks, key=get_score)
     
     # Optionally limit by total tokens
     if max_total_tokens:
         result = []
         total_tokens = 0
-        for chunk in limited:
-            content = chunk.get("content", "")
-            chunk_tokens = _count_tokens(content)
+        chunk_token_counts = count_tokens_batch([chunk.get("content", "") for chunk in limited])
+        for chunk, chunk_tokens in zip(limited, chunk_token_counts):
             if total_tokens + chunk_tokens <= max_total_tokens:
                 result.append(chunk)
                 total_tokens += chunk_tokens
@@ -134,9 +119,22 @@ def _index_stats(vs: VectorStore) -> Dict[str, Any]:
     }
 
 
+_NON_ALNUM_RUN_RE = re.compile(r"[^a-z0-9]+")
+_SEPARATOR_RUN_RE = re.compile(r"[_\-]+")
+_QUOTED_FRAGMENT_RE = re.compile(r'"([^"]+)"|\'([^\']+)\'|`([^`]+)`')
+
+# Maps every ASCII character outside [a-z0-9] to a space (applied after lower())
+_NORM_TABLE = str.maketrans({
+    chr(c): " " for c in range(128) if not (chr(c).isdigit() or "a" <= chr(c) <= "z")
+})
+
+
 def _normalize_fragment(value: str) -> str:
     """Normalize text for fuzzy filename matching."""
-    return re.sub(r"[^a-z0-9]+", " ", value.lower()).strip()
+    lowered = value.lower()
+    if lowered.isascii():
+        return " ".join(lowered.translate(_NORM_TABLE).split())
+    return _NON_ALNUM_RUN_RE.sub(" ", lowered).strip()
 
 
 def _generate_aliases(filename: str) -> List[str]:
@@ -145,15 +143,26 @@ def _generate_aliases(filename: str) -> List[str]:
     variants = {
         filename.lower(),
         base.lower(),
-        re.sub(r"[_\-]+", " ", base.lower()).strip(),
+        _SEPARATOR_RUN_RE.sub(" ", base.lower()).strip(),
     }
-    compact = re.sub(r"[^a-z0-9]", "", base.lower())
+    compact = _NON_ALNUM_RUN_RE.sub("", base.lower())
     if compact:
         variants.add(compact)
     variants = {v for v in variants if v}
     return list(variants)
 
 
+@lru_cache(maxsize=4096)
+def _alias_index(filename: str) -> Tuple[Tuple[str, str, Tuple[str, ...]], ...]:
+    """Precompute (alias, normalized alias, significant tokens) for a filename; reused across queries."""
+    entries = []
+    for alias in _generate_aliases(filename):
+        alias_norm = _normalize_fragment(alias)
+        if alias_norm:
+            entries.append((alias, alias_norm, tuple(tok for tok in alias_norm.split() if len(tok) > 2)))
+    return tuple(entries)
+
+
 def _detect_file_targets(
     query: str,
     inventory: List[Dict[str, Any]],
@@ -165,30 +174,30 @@ def _detect_file_targets(
 
     lowered_query = query.lower()
     normalized_query = _normalize_fragment(query)
-    query_tokens = set(normalized_query.split()) if normalized_query else set()
+    if not normalized_query:
+        # Every alias has an [a-z0-9] character, so nothing can match
+        return [], {}
+    query_tokens = set(normalized_query.split())
 
     # Capture quoted fragments as strong hints ("contract name", etc.)
-    quoted_fragments: List[str] = []
-    for match in re.findall(r'"([^"]+)"|\'([^\']+)\'|`([^`]+)`', query):
-        fragment = next((m for m in match if m), "")
+    quoted_fragments: set[str] = set()
+    for match in _QUOTED_FRAGMENT_RE.finditer(query):
+        # Exactly one of the three delimiter groups participates in a match
+        fragment = match.group(match.lastindex)
         if fragment:
             normalized = _normalize_fragment(fragment)
             if normalized:
-                quoted_fragments.append(normalized)
+                quoted_fragments.add(normalized)
 
     scored: List[Tuple[float, str]] = []
     for item in inventory:
         filename = (item or {}).get("filename")
-        if not filename:
+        # Avoid spurious matches on very short names (e.g., NDA -> 3 chars)
+        if not filename or len(filename) < 4:
             continue
 
-        aliases = _generate_aliases(filename)
         best_score = 0.0
-        for alias in aliases:
-            alias_norm = _normalize_fragment(alias)
-            if not alias_norm:
-                continue
-
+        for alias, alias_norm, alias_tokens in _alias_index(filename):
             # Direct substring match on raw query (handles full filename with extension)
             if alias in lowered_query:
                 best_score = max(best_score, len(alias) + 10)
@@ -198,15 +207,13 @@ def _detect_file_targets(
             if alias_norm and alias_norm in normalized_query:
                 best_score = max(best_score, len(alias_norm) + 5)
 
-            alias_tokens = [tok for tok in alias_norm.split() if len(tok) > 2]
-            if alias_tokens and all(tok in query_tokens for tok in alias_tokens):
+            if alias_tokens and query_tokens.issuperset(alias_tokens):
                 best_score = max(best_score, 5.0 * len(alias_tokens))
 
             if alias_norm in quoted_fragments:
                 best_score = max(best_score, len(alias_norm) + 15)
 
-        # Avoid spurious matches on very short names (e.g., NDA -> 3 chars)
-        if best_score > 0 and len(filename) >= 4:
+        if best_score > 0:
             scored.append((best_score, filename))
 
     scored.sort(key=lambda x: (-x[0], x[1]))
@@ -215,6 +222,14 @@ def _detect_file_targets(
     return [name for _, name in top], scores
 
 
+def _chunk_id(chunk: Dict[str, Any]) -> Optional[str]:
+    """Chunk id as a string for deduplication; Chroma ids are already strings."""
+    chunk_id = chunk.get("id")
+    if chunk_id is None or isinstance(chunk_id, str):
+        return chunk_id
+    return str(chunk_id)
+
+
 def assemble_context(vs: VectorStore, query: str, n_results: int = 10, require_keyword: bool = True) -> Dict[str, Any]:
     """Build context for a query suitable for inventory or RAG answering.
 
@@ -225,7 +240,14 @@ def assemble_context(vs: VectorStore, query: str, n_results: int = 10, require_k
         require_keyword: Whether to require keyword matches
 
     Returns keys: inventory, index_stats, schemas, retrieved_chunks
+    
+    The general hybrid search (query embedding + vector search) does not depend on the
+    inventory or targeted-file lookups, so it runs on a worker thread alongside them.
     """
+    # Request more results than needed since we'll prioritize and limit
+    general_future = _retrieval_executor.submit(
+        vs.hybrid_search, query, n_results=n_results * 2, require_keyword=require_keyword
+    )
     try:
         inventory = vs.get_inventory()
     except Exception as e:
@@ -251,7 +273,8 @@ def assemble_context(vs: VectorStore, query: str, n_results: int = 10, require_k
 
     retrieved: List[Dict[str, Any]] = []
     targeted_chunks: List[Dict[str, Any]] = []
-    targeted_found: set[str] = set()
+    # Filled in target order (highest match confidence first); targets are already unique
+    targeted_found: List[str] = []
     missing_filenames: List[str] = []
     seen_chunk_ids: set[str] = set()
 
@@ -259,63 +282,69 @@ def assemble_context(vs: VectorStore, query: str, n_results: int = 10, require_k
     # Limit targeted chunks to prevent context window pollution
     max_targeted_chunks_per_file = 5  # Limit chunks per targeted file
     if targeted_filenames:
-        for filename in targeted_filenames:
-            try:
-                chunks = vs.search_by_file(filename)
-            except Exception as exc:  # noqa: BLE001
-                logger.warning(f"Targeted retrieval failed for {filename}: {exc}")
-                chunks = []
+        # One collection query for all targeted files
+        try:
+            chunks_by_file = vs.search_by_files(targeted_filenames, max_targeted_chunks_per_file)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning(f"Targeted retrieval failed for {targeted_filenames}: {exc}")
+            chunks_by_file = {}
 
-            if not chunks:
+        for filename in targeted_filenames:
+            limited_chunks = chunks_by_file.get(filename) or []
+            if not limited_chunks:
                 missing_filenames.append(filename)
                 continue
 
-            targeted_found.add(filename)
-            # Limit chunks per file and truncate content
-            limited_chunks = chunks[:max_targeted_chunks_per_file]
+            targeted_found.append(filename)
+            # Truncate content of the leading chunks of each file
             for chunk in limited_chunks:
-                chunk_id = str(chunk.get("id")) if chunk.get("id") is not None else None
-                if chunk_id and chunk_id in seen_chunk_ids:
-                    continue
+                chunk_id = _chunk_id(chunk)
                 if chunk_id:
+                    if chunk_id in seen_chunk_ids:
+                        continue
                     seen_chunk_ids.add(chunk_id)
-                # Truncate chunk content to prevent context pollution
-                truncated_chunk = _truncate_chunk_content(chunk, max_chars=1000)
+                # Truncate in place: retrieved chunk dicts are fresh and owned by this call
+                truncated_chunk = _truncate_chunk_content(chunk, max_chars=1000, in_place=True)
                 targeted_chunks.append(truncated_chunk)
 
     retrieved.extend(targeted_chunks)
 
-    # General retrieval fallback (hybrid search)
-    # Request more results than needed since we'll prioritize and limit
+    # General retrieval fallback (hybrid search, started above)
     try:
-        general_results = vs.hybrid_search(query, n_results=n_results * 2, require_keyword=require_keyword)
+        general_results = general_future.result()
     except Exception as e:  # noqa: BLE001
         logger.warning(f"Retrieval failed: {e}")
         general_results = []
 
-    # Add general results, avoiding duplicates and truncating content
+    # Add general results, avoiding duplicates
+    general_chunk_refs: set[int] = set()
     for chunk in general_results:
-        chunk_id = str(chunk.get("id")) if chunk.get("id") is not None else None
-        if chunk_id and chunk_id in seen_chunk_ids:
-            continue
+        chunk_id = _chunk_id(chunk)
         if chunk_id:
+            if chunk_id in seen_chunk_ids:
+                continue
             seen_chunk_ids.add(chunk_id)
-        # Truncate chunk content
-        truncated_chunk = _truncate_chunk_content(chunk, max_chars=1000)
-        retrieved.append(truncated_chunk)
+        general_chunk_refs.add(id(chunk))
+        retrieved.append(chunk)
 
     # Prioritize by relevance score and limit total chunks
     # Use max 12 chunks total (targeted + general) to stay within context window
     max_total_chunks = 12
     retrieved = _prioritize_and_limit_chunks(retrieved, max_chunks=max_total_chunks)
+    # Truncate only the general results that made the cut (in place, as above)
+    for chunk in retrieved:
+        if id(chunk) in general_chunk_refs:
+            _truncate_chunk_content(chunk, max_chars=1000, in_place=True)
     
-    # Log context window usage for monitoring
-    total_chars = sum(len(chunk.get("content", "")) for chunk in retrieved)
-    total_tokens = sum(_count_tokens(chunk.get("content", "")) for chunk in retrieved)
-    logger.info(
-        f"Context assembled: {len(retrieved)} chunks, "
-        f"{total_chars} chars, ~{total_tokens} tokens"
-    )
+    # Log context window usage for monitoring; skip the token count when INFO is off
+    if logger.isEnabledFor(logging.INFO):
+        contents = [chunk.get("content", "") for chunk in retrieved]
+        total_chars = sum(map(len, contents))
+        total_tokens = sum(count_tokens_batch(contents))
+        logger.info(
+            f"Context assembled: {len(retrieved)} chunks, "
+            f"{total_chars} chars, ~{total_tokens} tokens"
+        )
 
     return {
         "inventory": inventory,
@@ -324,7 +353,7 @@ def assemble_context(vs: VectorStore, query: str, n_results: int = 10, require_k
         "retrieved_chunks": retrieved,
         "targeted_filenames": targeted_filenames,
         "targeted_matches": match_scores,
-        "targeted_found": sorted(targeted_found),
+        "targeted_found": targeted_found,
         "missing_filenames": missing_filenames,
         "targeted_chunks": targeted_chunks,
     }
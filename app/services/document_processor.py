@@ -1,19 +1,60 @@
 """Document processing service for extracting text from various file formats."""
 import io
+import os
 import re
-from typing import Dict, Any, List, Optional
-from pathlib import Path
+from typing import BinaryIO, Dict, Any, List, Optional, Union
 import logging
 from docx import Document
-import PyPDF2
+
 from datetime import datetime
 
 from app.services.vector_store import VectorStore
+from app.services.pdf_pages import PDF_PARALLEL_MIN_PAGES, count_pages, extract_pages_parallel, page_texts
 from app.services.search_ingest import chunk_text as token_chunk_text
 
 
 logger = logging.getLogger(__name__)
 
+# Entity patterns for extract_legal_entities, compiled once at import.
+# Dates and clauses stay as separate patterns: their matches can overlap, and
+# a single alternation would drop whichever overlapping match comes second.
+_MONTHS = r'(?:January|February|March|April|May|June|July|August|September|October|November|December)'
+_PARTY_RE = re.compile(r'\b[A-Z][A-Z\s&,\.]+(?:LLC|Inc\.|Corp\.|Ltd\.|Company|Co\.)\b')
+_DATE_RES = [
+    re.compile(r'\b\d{1,2}[/-]\d{1,2}[/-]\d{2,4}\b', re.IGNORECASE),
+    re.compile(r'\b\d{1,2}\s+' + _MONTHS + r'\s+\d{2,4}\b', re.IGNORECASE),
+    re.compile(r'\b' + _MONTHS + r'\s+\d{1,2},?\s+\d{2,4}\b', re.IGNORECASE),
+]
+_AMOUNT_RE = re.compile(r'\$[\d,]+\.?\d*')
+_TERMS_RE = re.compile(r'(?:terms?\s+(?:and|&)\s+conditions?|t&c|terms?\s+of\s+(?:use|service))[^\n]*', re.IGNORECASE)
+_CLAUSE_RES = [
+    re.compile(r'(?:confidentiality|non-disclosure|nda)\s+(?:clause|agreement|provision)[^\n]*', re.IGNORECASE),
+    re.compile(r'(?:termination|cancellation)\s+(?:clause|provision)[^\n]*', re.IGNORECASE),
+    re.compile(r'(?:liability|indemnification)\s+(?:clause|provision)[^\n]*', re.IGNORECASE),
+    re.compile(r'(?:governing\s+law|jurisdiction)\s+(?:clause|provision)[^\n]*', re.IGNORECASE),
+]
+
+# Literals every match of the corresponding patterns must contain. A substring check
+# runs at memchr speed, so a pattern is only scanned when its literal is present.
+# Case-insensitive hints are checked against text.casefold() and avoid the letter i,
+# which IGNORECASE also matches as a dotless i that casefold() leaves unchanged.
+_PARTY_HINTS = ("LLC", "Inc.", "Ltd.", "Co")
+_NUMERIC_DATE_HINTS = ("/", "-")
+_MONTH_HINTS = ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec")
+_TERMS_HINTS = ("term", "t&c")
+_CLAUSE_HINTS = ("clause", "agreement", "prov")
+
+
+def _contains_any(text: str, hints) -> bool:
+    return any(hint in text for hint in hints)
+
+
+def _as_stream(file_content: Union[bytes, BinaryIO]) -> BinaryIO:
+    """Wrap raw bytes in a BytesIO; pass file objects through unchanged."""
+    if isinstance(file_content, (bytes, bytearray)):
+        return io.BytesIO(file_content)
+    return file_content
+
 
 class DocumentProcessor:
     """Service for processing legal documents and extracting content."""
@@ -21,33 +62,45 @@ class DocumentProcessor:
     def __init__(self, vector_store: VectorStore):
         """Initialize document processor with vector store."""
         self.vector_store = vector_store
+        # Extractor per lowercase file extension; each accepts bytes or a binary file object
+        self._extractors = {
+            ".docx": self.extract_text_from_docx,
+            ".doc": self.extract_text_from_docx,
+            ".pdf": self.extract_text_from_pdf,
+            ".txt": self.extract_text_from_text,
+            ".rtf": self.extract_text_from_text,
+        }
     
-    def extract_text_from_docx(self, file_content: bytes) -> str:
+    def extract_text_from_docx(self, file_content: Union[bytes, BinaryIO]) -> str:
         """
         Extract text from a Word document.
         
         Args:
-            file_content: Binary content of the Word document
+            file_content: Binary content of the Word document, or a seekable binary file object
             
         Returns:
             Extracted text as string
         """
         try:
-            doc = Document(io.BytesIO(file_content))
+            doc = Document(_as_stream(file_content))
             text_parts = []
             
             # Extract text from paragraphs
+            # paragraph.text and cell.text rebuild the string from XML runs on each access,
+            # so read and strip them once
             for paragraph in doc.paragraphs:
-                if paragraph.text.strip():
-                    text_parts.append(paragraph.text.strip())
+                paragraph_text = paragraph.text.strip()
+                if paragraph_text:
+                    text_parts.append(paragraph_text)
             
             # Extract text from tables
             for table in doc.tables:
                 for row in table.rows:
                     row_text = []
                     for cell in row.cells:
-                        if cell.text.strip():
-                            row_text.append(cell.text.strip())
+                        cell_text = cell.text.strip()
+                        if cell_text:
+                            row_text.append(cell_text)
                     if row_text:
                         text_parts.append(" | ".join(row_text))
             
@@ -59,44 +112,56 @@ class DocumentProcessor:
             logger.error(f"Failed to extract text from Word document, error: {str(e)}")
             raise
     
-    def extract_text_from_pdf(self, file_content: bytes) -> str:
+    def extract_text_from_pdf(self, file_content: Union[bytes, BinaryIO]) -> str:
         """
         Extract text from a PDF document.
         
         Args:
-            file_content: Binary content of the PDF document
+            file_content: Binary content of the PDF document, or a seekable binary file object
             
         Returns:
             Extracted text as string
         """
         try:
-            pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_content))
-            text_parts = []
-            
-            for page in pdf_reader.pages:
-                page_text = page.extract_text()
-                if page_text.strip():
-                    text_parts.append(page_text.strip())
+            stream = _as_stream(file_content)
+            n_pages = count_pages(stream)
+            
+            text_parts = None
+            if n_pages >= PDF_PARALLEL_MIN_PAGES:
+                # Large PDFs: extract page ranges in worker processes from the raw bytes
+                if isinstance(file_content, (bytes, bytearray)):
+                    data = bytes(file_content)
+                else:
+                    stream.seek(0)
+                    data = stream.read()
+                text_parts = extract_pages_parallel(data, n_pages)
+            
+            if text_parts is None:
+                stream.seek(0)
+                _, text_parts = page_texts(stream)
             
             full_text = "\n".join(text_parts)
-            logger.info(f"Extracted text from PDF document, pages: {len(pdf_reader.pages)}, length: {len(full_text)}")
+            logger.info(f"Extracted text from PDF document, pages: {n_pages}, length: {len(full_text)}")
             return full_text
             
         except Exception as e:
             logger.error(f"Failed to extract text from PDF document, error: {str(e)}")
             raise
     
-    def extract_text_from_text(self, file_content: bytes) -> str:
+    def extract_text_from_text(self, file_content: Union[bytes, BinaryIO]) -> str:
         """
         Extract text from a plain text file.
         
         Args:
-            file_content: Binary content of the text file
+            file_content: Binary content of the text file, or a binary file object
             
         Returns:
             Extracted text as string
         """
         try:
+            if not isinstance(file_content, (bytes, bytearray)):
+                file_content = file_content.read()
+            
             # Try UTF-8 first, then fallback to other encodings
             try:
                 text = file_content.decode('utf-8')
@@ -113,28 +178,40 @@ class DocumentProcessor:
             logger.error(f"Failed to extract text from text file, error: {str(e)}")
             raise
     
-    def extract_text(self, file_content: bytes, file_name: str) -> str:
+    def extract_text(self, file_content: Union[bytes, BinaryIO], file_name: str) -> str:
         """
         Extract text from a document based on its file extension.
         
         Args:
-            file_content: Binary content of the file
+            file_content: Binary content of the file, or a seekable binary file object
             file_name: Name of the file (used to determine type)
             
         Returns:
             Extracted text as string
         """
-        file_extension = Path(file_name).suffix.lower()
-        
-        if file_extension in ['.docx', '.doc']:
-            return self.extract_text_from_docx(file_content)
-        elif file_extension == '.pdf':
-            return self.extract_text_from_pdf(file_content)
-        elif file_extension in ['.txt', '.rtf']:
-            return self.extract_text_from_text(file_content)
-        else:
-            logger.warning(f"Unsupported file type, file_name=file_name, extension: {file_extension}")
+        file_extension = os.path.splitext(file_name)[1].lower()
+        extractor = self._extractors.get(file_extension)
+        if extractor is None:
+            logger.warning(f"Unsupported file type, file_name: {file_name}, extension: {file_extension}")
             return ""
+        return extractor(file_content)
+    
+    def extract_text_stream(self, fileobj: BinaryIO, file_name: str) -> str:
+        """
+        Extract text from a seekable binary file object based on the file extension.
+        
+        PDF and Word parsers read directly from the stream, so spooled uploads are
+        not copied into a single bytes object first.
+        
+        Args:
+            fileobj: Seekable binary file object positioned anywhere
+            file_name: Name of the file (used to determine type)
+            
+        Returns:
+            Extracted text as string
+        """
+        fileobj.seek(0)
+        return self.extract_text(fileobj, file_name)
     
     def chunk_text(self, text: str, file_id: str = "", filename: str = "") -> List[str]:
         """
@@ -175,36 +252,31 @@ class DocumentProcessor:
         }
         
         try:
+            folded = text.casefold()
+            
             # Extract potential party names (capitalized words/phrases)
-            party_pattern = r'\b[A-Z][A-Z\s&,\.]+(?:LLC|Inc\.|Corp\.|Ltd\.|Company|Co\.)\b'
-            entities["parties"] = list(set(re.findall(party_pattern, text)))
+            if _contains_any(text, _PARTY_HINTS):
+                entities["parties"] = list(set(_PARTY_RE.findall(text)))
             
             # Extract dates
-            date_patterns = [
-                r'\b\d{1,2}[/-]\d{1,2}[/-]\d{2,4}\b',
-                r'\b\d{1,2}\s+(?:January|February|March|April|May|June|July|August|September|October|November|December)\s+\d{2,4}\b',
-                r'\b(?:January|February|March|April|May|June|July|August|September|October|November|December)\s+\d{1,2},?\s+\d{2,4}\b'
-            ]
-            for pattern in date_patterns:
-                entities["dates"].extend(re.findall(pattern, text, re.IGNORECASE))
+            if _contains_any(text, _NUMERIC_DATE_HINTS):
+                entities["dates"].extend(_DATE_RES[0].findall(text))
+            if _contains_any(folded, _MONTH_HINTS):
+                for pattern in _DATE_RES[1:]:
+                    entities["dates"].extend(pattern.findall(text))
             
             # Extract monetary amounts
-            amount_pattern = r'\$[\d,]+\.?\d*'
-            entities["amounts"] = list(set(re.findall(amount_pattern, text)))
+            if "$" in text:
+                entities["amounts"] = list(set(_AMOUNT_RE.findall(text)))
             
             # Extract terms and conditions sections
-            terms_pattern = r'(?:terms?\s+(?:and|&)\s+conditions?|t&c|terms?\s+of\s+(?:use|service))[^\n]*'
-            entities["terms_conditions"] = re.findall(terms_pattern, text, re.IGNORECASE)
+            if _contains_any(folded, _TERMS_HINTS):
+                entities["terms_conditions"] = _TERMS_RE.findall(text)
             
             # Extract common legal clauses
-            clause_patterns = [
-                r'(?:confidentiality|non-disclosure|nda)\s+(?:clause|agreement|provision)[^\n]*',
-                r'(?:termination|cancellation)\s+(?:clause|provision)[^\n]*',
-                r'(?:liability|indemnification)\s+(?:clause|provision)[^\n]*',
-                r'(?:governing\s+law|jurisdiction)\s+(?:clause|provision)[^\n]*'
-            ]
-            for pattern in clause_patterns:
-                entities["clauses"].extend(re.findall(pattern, text, re.IGNORECASE))
+            if _contains_any(folded, _CLAUSE_HINTS):
+                for pattern in _CLAUSE_RES:
+                    entities["clauses"].extend(pattern.findall(text))
             
             logger.info(f"Extracted legal entities, parties: {len(entities['parties'])}, dates: {len(entities['dates'])}, amounts: {len(entities['amounts'])}, terms_conditions: {len(entities['terms_conditions'])}, clauses: {len(entities['clauses'])}")
             
@@ -249,18 +321,20 @@ class DocumentProcessor:
                 "chunk_count": len(chunks)
             }
             
-            # Store chunks with metadata
-            chunk_ids = []
-            for i, chunk in enumerate(chunks):
-                chunk_metadata = doc_metadata.copy()
-                chunk_metadata.update({
-                    "chunk_index": i,
-                    "chunk_text": chunk
-                })
-                
-                chunk_id = f"{file_info['name']}_{i}"
-                self.vector_store.add_document(chunk_id, chunk, chunk_metadata)
-                chunk_ids.append(chunk_id)
+            # Store chunks with metadata; per-chunk metadata is built lazily so only
+            # one embedding batch is materialized at a time
+            chunk_ids = [f"{file_info['name']}_{i}" for i in range(len(chunks))]
+            
+            def iter_chunks():
+                for i, chunk in enumerate(chunks):
+                    chunk_metadata = doc_metadata.copy()
+                    chunk_metadata.update({
+                        "chunk_index": i,
+                        "chunk_text": chunk
+                    })
+                    yield chunk_ids[i], chunk, chunk_metadata
+            
+            self.vector_store.add_document_stream(iter_chunks())
             
             result = {
                 "status": "success",
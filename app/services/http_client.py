@@ -0,0 +1,42 @@
+"""
+Process-wide HTTP connection pool shared by every OpenAI client.
+
+The chat, embedding and intent clients each used to open their own pool, so
+concurrent calls from different services paid separate TCP+TLS handshakes to
+the same host. Passing this one client as ``http_client`` keeps a single set of
+warm keep-alive connections per worker.
+"""
+import logging
+from typing import Optional
+
+import httpx
+from openai import DefaultHttpxClient
+
+logger = logging.getLogger(__name__)
+
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 20
+HTTP_MAX_CONNECTIONS = 40
+
+_http_client: Optional[httpx.Client] = None
+
+
+def get_http_client() -> httpx.Client:
+    """Get or create the shared HTTP client (singleton)."""
+    global _http_client
+    if _http_client is None:
+        _http_client = DefaultHttpxClient(
+            limits=httpx.Limits(
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                max_connections=HTTP_MAX_CONNECTIONS,
+            )
+        )
+        logger.info("Initialized shared HTTP connection pool")
+    return _http_client
+
+
+def close_http_client() -> None:
+    """Close pooled connections; called on app shutdown."""
+    global _http_client
+    if _http_client is not None:
+        _http_client.close()
+        _http_client = None
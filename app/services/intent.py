@@ -5,9 +5,11 @@ from typing import Literal, List, Dict, Any, Optional
 import logging
 import json
 import hashlib
+import re
 from collections import OrderedDict
 
 from app.config import settings
+from app.services.http_client import get_http_client
 from openai import OpenAI
 
 logger = logging.getLogger(__name__)
@@ -28,7 +30,7 @@ def _get_openai_client() -> OpenAI:
     """Get or create OpenAI client for intent detection."""
     global _openai_client
     if _openai_client is None:
-        _openai_client = OpenAI(api_key=settings.openai_api_key)
+        _openai_client = OpenAI(api_key=settings.openai_api_key, http_client=get_http_client())
         logger.debug("Initialized OpenAI client for intent detection")
     return _openai_client
 
@@ -74,24 +76,57 @@ def _get_intent_tool_definition() -> Dict[str, Any]:
     }
 
 
+# Keyword fallback phrases, each set compiled into one alternation (plain substring match)
+_INVENTORY_KEYWORDS = (
+    "what files", "files in memory", "what's indexed", "whats indexed",
+    "show documents", "list files", "documents loaded", "what documents",
+)
+_CAPABILITIES_KEYWORDS = ("what can you do", "capabilities", "features")
+_INVENTORY_RE = re.compile("|".join(map(re.escape, _INVENTORY_KEYWORDS)))
+_CAPABILITIES_RE = re.compile("|".join(map(re.escape, _CAPABILITIES_KEYWORDS)))
+
+
+# Whole-query commands answered without a model call; anything longer or looser
+# (e.g. "what documents mention indemnity?") is left to the model
+_COMMAND_TAIL = r"(?:\s+(?:please|now))?\s*[?.!]*\s*"
+_INVENTORY_COMMAND_RE = re.compile(
+    r"^\s*(?:please\s+)?(?:"
+    r"(?:list|show(?: me)?)(?: all)?(?: the)? (?:files|documents)(?: in memory| loaded| indexed)?"
+    r"|what (?:files|documents) (?:are|do you have)(?: (?:loaded|indexed|in memory))?"
+    r"|what'?s indexed"
+    r")" + _COMMAND_TAIL + r"$"
+)
+_CAPABILITIES_COMMAND_RE = re.compile(
+    r"^\s*(?:please\s+)?(?:"
+    r"what can you do"
+    r"|what are your (?:capabilities|features)"
+    r"|(?:list|show(?: me)?) (?:your )?(?:capabilities|features)"
+    r"|capabilities|features|help"
+    r")" + _COMMAND_TAIL + r"$"
+)
+
+
+def _command_intent(query: str) -> Literal["inventory", "capabilities", "rag"]:
+    """Match the whole query against explicit inventory/capabilities commands."""
+    q = (query or "").lower()
+    if _INVENTORY_COMMAND_RE.match(q):
+        return "inventory"
+    if _CAPABILITIES_COMMAND_RE.match(q):
+        return "capabilities"
+    return "rag"
+
+
 def _keyword_fallback(query: str) -> Literal["inventory", "capabilities", "rag"]:
     """
     Fallback keyword-based intent detection.
     
-    Used when tool calling fails or as a backup.
+    Loose substring matching, used only as the backup when tool calling fails.
     """
     q = (query or "").lower()
-    inv_kw = [
-        "what files", "files in memory", "what's indexed", "whats indexed",
-        "show documents", "list files", "documents loaded", "what documents",
-    ]
-    for k in inv_kw:
-        if k in q:
-            return "inventory"
-    cap_kw = ["what can you do", "capabilities", "features"]
-    for k in cap_kw:
-        if k in q:
-            return "capabilities"
+    if _INVENTORY_RE.search(q):
+        return "inventory"
+    if _CAPABILITIES_RE.search(q):
+        return "capabilities"
     return "rag"
 
 
@@ -117,6 +152,13 @@ def detect_intent(
         logger.debug(f"Intent cache hit for query: {query[:50]}...")
         return _intent_cache[cache_key]
     
+    # A query that is exactly an inventory/capabilities command needs no model call
+    command_intent = _command_intent(query)
+    if command_intent != "rag":
+        logger.debug(f"Intent matched as command: {command_intent}, query: {query[:50]}...")
+        _cache_intent(cache_key, command_intent)
+        return command_intent
+    
     try:
         client = _get_openai_client()
         
@@ -269,7 +311,8 @@ def detect_intent(
 
 def _hash_query(query: str, conversation_history: Optional[List[Dict[str, str]]] = None) -> str:
     """Create a hash key for caching based on query and recent history."""
-    m = hashlib.sha256()
+    # Only used as an in-process dict key, so a fast 128-bit BLAKE2b digest is plenty
+    m = hashlib.blake2b(digest_size=16)
     m.update(query.encode("utf-8"))
     if conversation_history:
         # Include last 2 messages for context
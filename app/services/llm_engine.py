@@ -13,11 +13,14 @@ from __future__ import annotations
 
 import json
 import hashlib
+import re
 from collections import OrderedDict
 from typing import Any, Dict, List, Optional, Tuple
 
 import logging
 from app.config import settings
+from app.prompts.legal_formatting import preview_text, strip_meta
+from app.services.http_client import get_http_client
 from openai import OpenAI
 
 logger = logging.getLogger(__name__)
@@ -49,7 +52,8 @@ _cache = _LRUCache(64)
 def _get_openai_client() -> OpenAI:
     global _openai_client
     if _openai_client is None:
-        _openai_client = OpenAI(api_key=settings.openai_api_key)
+        # No client-side retries: run_llm/stream_llm own the retry policy
+        _openai_client = OpenAI(api_key=settings.openai_api_key, http_client=get_http_client(), max_retries=0)
         logger.info("Initialized OpenAI client for GPT-5")
     return _openai_client
 
@@ -183,6 +187,11 @@ def _trim_words(text: str, max_words: int) -> str:
     return " ".join(words[:max_words]).rstrip(" ,;-") + "."
 
 
+def _filter_citations(text: str, allowed: set) -> str:
+    # Keep [filename] citations only for files that were actually in the context
+    return re.sub(r"\[(.*?)\]", lambda m: f"[{m.group(1).strip()}]" if m.group(1).strip() in allowed else "", text)
+
+
 def _sanitize(text: str, max_words: int) -> str:
     # Remove echoed sections and roles
     lines = text.splitlines()
@@ -205,20 +214,6 @@ def _sanitize(text: str, max_words: int) -> str:
     return s.strip()
 
 
-def _strip_meta(text: str) -> str:
-    """Remove obvious metadata markers to avoid seeding the model with them."""
-    import re
-    lines = []
-    for ln in text.splitlines():
-        low = ln.strip().lower()
-        if low.startswith(("user:", "assistant:", "history:", "context:", "system:")):
-            continue
-        lines.append(ln)
-    s = "\n".join(lines)
-    s = re.sub(r"\b(?:User|Assistant|History|Context|System)\s*:\s*", "", s, flags=re.IGNORECASE)
-    return s
-
-
 def clean_output(text: str) -> str:
     # DEBUG: Log input to clean_output
     logger.info(f"clean_output INPUT - Length: {len(text)} chars, Lines: {len(text.split(chr(10)))}")
@@ -249,6 +244,23 @@ class LLMEngine:
     All methods are static and use shared OpenAI client with caching.
     """
     
+    @staticmethod
+    def preload(timeout: float = 5.0) -> None:
+        """
+        Create the shared OpenAI client and open its connection pool ahead of the first request.
+        
+        Called once per worker at startup. The warmup request is a lightweight model
+        listing (no tokens billed); failures are logged and the first real call simply
+        connects as usual.
+        """
+        try:
+            client = _get_openai_client()
+            # with_options shares the underlying HTTP pool, so the warmed connection is reused
+            client.with_options(timeout=timeout, max_retries=0).models.list()
+            logger.info("OpenAI connection warmed up")
+        except Exception as e:
+            logger.warning(f"OpenAI warmup failed, continuing without it: {e}")
+    
     @staticmethod
     def summarize(query: str, chunks: List[Dict[str, Any]], max_words: int = 75) -> str:
         """
@@ -268,8 +280,7 @@ class LLMEngine:
         for c in chunks[:8]:
             fname = (c.get("metadata") or {}).get("file_name") or c.get("filename") or "Unknown"
             text = c.get("content") or c.get("text") or ""
-            text = _strip_meta(text)
-            context_lines.append(f"[File: {fname}]\n{text[:800]}")
+            context_lines.append(f"[File: {fname}]\n{preview_text(text, 800)}")
         context = "\n\n".join(context_lines)
         system = (
             "You are LegalGPT, the internal legal assistant.\n"
@@ -290,22 +301,11 @@ class LLMEngine:
             fn = md.get("file_name")
             if fn:
                 allowed.append(fn)
-        result = clean_output(completion)
-        if allowed:
-            import re
-            allowed_set = set(allowed)
-            def repl(m):
-                token = m.group(1).strip()
-                return f"[{token}]" if token in allowed_set else ""
-            result = re.sub(r"\[(.*?)\]", repl, result)
-        else:
-            import re
-            result = re.sub(r"\[(.*?)\]", "", result)
-        return result
+        return _filter_citations(clean_output(completion), set(allowed))
 
     @staticmethod
     def summarize_text(filename: str, text: str, max_words: int = 50) -> str:
-        snippet = _strip_meta(text[:1500])
+        snippet = strip_meta(text[:1500])
         system = (
             "You are LegalGPT, the internal legal assistant.\n"
             "Speak naturally and clearly using plain English.\n"
@@ -340,8 +340,7 @@ class LLMEngine:
         context_lines = []
         for c in chunks[:5]:
             text = c.get("content") or c.get("text") or ""
-            text = _strip_meta(text)
-            context_lines.append(text[:1000])
+            context_lines.append(preview_text(text, 1000))
         
         context = "\n\n".join(context_lines)
         
@@ -372,6 +371,103 @@ class LLMEngine:
         result = clean_output(completion)
         return _trim_words(result, max_words)
 
+    @staticmethod
+    def summarize_all(
+        keyword: str,
+        chunks_by_file: Dict[str, List[Dict[str, Any]]],
+        overall_chunks: List[Dict[str, Any]],
+        max_words_overall: int = 75,
+        max_words_per_file: int = 40,
+    ) -> Dict[str, Any]:
+        """
+        Generate the overall search summary and per-document keyword summaries in one LLM call.
+        
+        Args:
+            keyword: The search keyword/query term
+            chunks_by_file: Mapping of filename to its relevant chunks (with 'content')
+            overall_chunks: Top chunks across all files for the overall summary
+            max_words_overall: Maximum words in the overall summary (default: 75)
+            max_words_per_file: Maximum words per document summary (default: 40)
+            
+        Returns:
+            Dictionary with:
+            - overall: Overall summary, or None if the model did not return one
+            - per_file: Mapping of filename to summary for the documents the model returned
+            Callers should fall back to summarize / summarize_file_keyword_context for gaps.
+        """
+        results: Dict[str, Any] = {"overall": None, "per_file": {}}
+        filenames = list(chunks_by_file)
+        
+        doc_blocks = []
+        for i, filename in enumerate(filenames):
+            context_lines = []
+            for c in chunks_by_file[filename][:5]:
+                text = c.get("content") or c.get("text") or ""
+                context_lines.append(preview_text(text, 1000))
+            doc_blocks.append(f"[id: {i}] [File: {filename}]\n" + "\n\n".join(context_lines))
+        
+        overall_lines = []
+        for c in overall_chunks[:8]:
+            fname = (c.get("metadata") or {}).get("file_name") or c.get("filename") or "Unknown"
+            text = c.get("content") or c.get("text") or ""
+            overall_lines.append(f"[File: {fname}]\n{preview_text(text, 800)}")
+        
+        system = (
+            "You are LegalGPT, a legal assistant specializing in contract analysis.\n"
+            "Generate specific, informative summaries that identify document type, parties, and key provisions.\n"
+            "Be precise and factual. Include specific details like document type, parties (if mentioned), year (if mentioned), and key clause types.\n"
+            "Return ONLY a JSON object: {\"overall\": \"...\", \"summaries\": [{\"id\": 0, \"summary\": \"...\"}]} "
+            "with one summaries entry per document, using the exact id given."
+        )
+        user = (
+            f"Search query: {keyword}\n\n"
+            f"Top matching passages:\n" + "\n\n".join(overall_lines) + "\n\n"
+            f"Documents:\n" + "\n\n---\n\n".join(doc_blocks)
+            + f"\n\n'overall': a short plain-English summary (max {max_words_overall} words) answering the search query "
+            f"from the top matching passages, citing filenames in [brackets] where appropriate.\n"
+            f"'summaries': for EACH document, a specific summary (max {max_words_per_file} words) that:\n"
+            f"- Identifies the document type (e.g., 'Master Services Agreement', 'NDA', 'DPA')\n"
+            f"- Mentions parties if clearly identified in the content\n"
+            f"- Lists the key clause types/provisions found (e.g., 'scope, term, termination, and governing law')\n"
+            f"- Explains why this document is relevant to '{keyword}'\n\n"
+            f"Be specific and avoid generic phrases like 'relevant content found'."
+        )
+        messages = [
+            {"role": "system", "content": system},
+            {"role": "user", "content": user},
+        ]
+        completion = _openai_complete_with_json_mode(messages, max_tokens=400 * (len(filenames) + 1))
+        
+        try:
+            parsed = json.loads(completion.strip())
+        except Exception as e:
+            logger.warning(f"Combined summary JSON parse failed: {e}, preview: {completion[:200]}")
+            return results
+        if not isinstance(parsed, dict):
+            return results
+        
+        overall = clean_output(str(parsed.get("overall") or ""))
+        if overall:
+            allowed = {fn for fn in ((c.get("metadata") or {}).get("file_name") for c in overall_chunks) if fn}
+            results["overall"] = _filter_citations(overall, allowed)
+        
+        entries = parsed.get("summaries", [])
+        for entry in entries if isinstance(entries, list) else []:
+            if not isinstance(entry, dict):
+                continue
+            try:
+                idx = int(entry.get("id"))
+            except (TypeError, ValueError):
+                continue
+            summary = clean_output(str(entry.get("summary") or ""))
+            if 0 <= idx < len(filenames) and summary:
+                results["per_file"][filenames[idx]] = _trim_words(summary, max_words_per_file)
+        logger.info(
+            f"summarize_all returning overall={'yes' if results['overall'] else 'no'}, "
+            f"per-file summaries for {len(results['per_file'])}/{len(filenames)} documents"
+        )
+        return results
+
     @staticmethod
     def summarize_clause(clause_text: str, max_words: int = 40) -> str:
         """
@@ -486,7 +582,7 @@ JSON.stringify equivalent: {json.dumps(result)}
         )
         user = (
             f"Extract these terms: {', '.join(fields_hint)}\n\n"
-            f"Contract:\n{_strip_meta(text)}\n\n"
+            f"Contract:\n{strip_meta(text)}\n\n"
             f"Return JSON object with 'terms' array. Be concise - extract only what's present."
         )
         messages = [
@@ -568,13 +664,97 @@ JSON.stringify equivalent: {json.dumps(result)}
             logger.warning(f"Raw completion preview: {completion[:500]}")
         return items
 
+    @staticmethod
+    def extract_terms_multi(
+        docs: List[Tuple[str, str]],
+        expected_fields: Optional[List[str]] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Extract contract terms from several documents in a single LLM call.
+
+        Args:
+            docs: List of (filename, contract_text) tuples
+            expected_fields: Optional list of term names to extract
+
+        Returns:
+            List of term lists, aligned with the order of ``docs`` (empty list for
+            documents the model did not return)
+        """
+        if not docs:
+            return []
+        fields_hint = expected_fields or [
+            "parties", "counterparty", "effective_date", "expiration_date",
+            "renewal_terms", "termination_clause", "payment_terms",
+            "governing_law", "confidentiality", "liability_cap"
+        ]
+        system = (
+            "You are LegalGPT, an expert legal assistant.\n"
+            "Extract contract terms from EACH document and return ONLY a valid JSON object with a 'documents' array.\n\n"
+            "CRITICAL: Return ONLY a JSON object. No markdown, no code blocks, no explanations.\n"
+            "Format: {\"documents\": [{\"id\": \"doc_id\", \"terms\": [{\"field\": \"term_name\", \"value\": \"extracted_value\", \"confidence\": 0.9, \"snippet\": \"brief quote\", \"location\": \"section\"}]}]}\n\n"
+            "Return one entry per document, using the exact id given. "
+            "Keep snippets under 60 characters. Extract only terms that are clearly present. Ensure valid JSON syntax."
+        )
+        doc_blocks = []
+        for i, (filename, text) in enumerate(docs):
+            doc_blocks.append(f"[id: {i}] [File: {filename}]\n{strip_meta(text[:6000])}")
+        user = (
+            f"Extract these terms: {', '.join(fields_hint)}\n\n"
+            + "\n\n---\n\n".join(doc_blocks)
+            + "\n\nReturn JSON object with 'documents' array. Be concise - extract only what's present."
+        )
+        messages = [
+            {"role": "system", "content": system},
+            {"role": "user", "content": user},
+        ]
+        completion = _openai_complete_with_json_mode(messages, max_tokens=16000)
+
+        results: List[List[Dict[str, Any]]] = [[] for _ in docs]
+        stripped = completion.strip()
+        if stripped.startswith("```"):
+            lines = stripped.split('\n')
+            if lines[0].startswith("```"):
+                lines = lines[1:]
+            if lines and lines[-1].strip() == "```":
+                lines = lines[:-1]
+            stripped = '\n'.join(lines).strip()
+        try:
+            parsed = json.loads(stripped)
+        except Exception as e:
+            logger.warning(f"Multi-document JSON parse failed: {e}, attempting bracket extraction")
+            start = stripped.find("{")
+            end = stripped.rfind("}")
+            try:
+                import re
+                parsed = json.loads(re.sub(r',\s*([}\]])', r'\1', stripped[start:end+1]))
+            except Exception as e2:
+                logger.error(f"Multi-document bracket extraction failed: {e2}, preview: {stripped[:300]}")
+                return results
+
+        entries = parsed.get("documents", []) if isinstance(parsed, dict) else []
+        for entry in entries if isinstance(entries, list) else []:
+            if not isinstance(entry, dict):
+                continue
+            try:
+                idx = int(entry.get("id"))
+            except (TypeError, ValueError):
+                continue
+            terms = entry.get("terms")
+            if 0 <= idx < len(docs) and isinstance(terms, list):
+                results[idx] = terms
+        logger.info(f"extract_terms_multi returning terms for {sum(1 for r in results if r)}/{len(docs)} documents")
+        return results
+
     @staticmethod
     def analyze_contract_sentiment(
         contract_text: str,
-        extracted_terms: List[Dict[str, Any]]
+        extracted_terms: Optional[List[Dict[str, Any]]] = None
     ) -> Dict[str, Any]:
         """
         Analyze contract sentiment to determine if it's good to sign as-is.
+
+        ``extracted_terms`` is optional so the analysis can run alongside term
+        extraction; without it the assessment is based on the contract text alone.
         
         Returns a dictionary with:
         - score: 0-100 (higher is better)
@@ -585,14 +765,14 @@ JSON.stringify equivalent: {json.dumps(result)}
         """
         # Build summary of extracted terms for analysis
         terms_summary = []
-        for term in extracted_terms:
+        for term in extracted_terms or []:
             field = term.get("field", "")
             value = term.get("value", "")
             if field and value:
                 terms_summary.append(f"{field}: {value}")
         
         terms_text = "\n".join(terms_summary) if terms_summary else "No terms extracted"
-        contract_snippet = _strip_meta(contract_text[:3000])  # Reduced to 3000 chars to save tokens for terms extraction
+        contract_snippet = strip_meta(contract_text[:3000])  # Reduced to 3000 chars to save tokens for terms extraction
         
         system = (
             "You are LegalGPT, a legal contract analyst.\n"
@@ -601,9 +781,10 @@ JSON.stringify equivalent: {json.dumps(result)}
             "Score: 70-100=Good, 40-69=Review, 0-39=High Risk. Keep explanation under 20 words."
         )
         
+        terms_block = f"Terms:\n{terms_text}\n\n" if extracted_terms is not None else ""
         user = (
             f"Contract:\n{contract_snippet[:2000]}\n\n"
-            f"Terms:\n{terms_text}\n\n"
+            f"{terms_block}"
             f"Quick analysis: score, label, brief explanation, top 2 concerns, top 2 positives."
         )
         
@@ -0,0 +1,151 @@
+"""
+Page-text extraction for PDFs, in-process or across a worker process pool.
+
+PDFium (pypdfium2) is used when installed, PyPDF2 otherwise. PDFium is not
+thread-safe, so in-process calls are serialized by a lock; large documents are
+instead split into page ranges that worker processes extract independently
+from the same bytes, which also spreads PyPDF2's GIL-bound parsing over cores.
+Results are joined in page order.
+
+Workers are started with spawn, which re-imports the parent's ``__main__``
+module (the whole app under ``python -m app.main``), so starting the pool takes
+seconds; it is created on first use and kept for the life of the process.
+"""
+import io
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import BinaryIO, List, Optional, Tuple
+
+import PyPDF2
+
+try:
+    # Optional PDFium (C++) text backend, much faster than PyPDF2's pure-Python parser
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Below this many pages the per-worker re-parse of the file outweighs the speedup
+PDF_PARALLEL_MIN_PAGES = 32
+
+# PDFium is not thread-safe; every PDFium call in this process holds this lock
+_pdfium_lock = threading.Lock()
+
+_pdf_executor: Optional[ProcessPoolExecutor] = None
+# Guards creating and closing the pool; callers run in concurrent worker threads
+_pdf_executor_lock = threading.Lock()
+
+
+def _page_texts_pdfium(stream: BinaryIO, start: int, stop: Optional[int]) -> Tuple[int, List[str]]:
+    with _pdfium_lock:
+        pdf = pdfium.PdfDocument(stream)
+        try:
+            n_pages = len(pdf)
+            texts = []
+            for index in range(start, n_pages if stop is None else stop):
+                page = pdf[index]
+                textpage = page.get_textpage()
+                # PDFium separates lines with CRLF
+                page_text = textpage.get_text_bounded().replace("\r\n", "\n").strip()
+                textpage.close()
+                page.close()
+                if page_text:
+                    texts.append(page_text)
+            return n_pages, texts
+        finally:
+            pdf.close()
+
+
+def _page_texts_pypdf2(stream: BinaryIO, start: int, stop: Optional[int]) -> Tuple[int, List[str]]:
+    reader = PyPDF2.PdfReader(stream)
+    n_pages = len(reader.pages)
+    texts = []
+    for index in range(start, n_pages if stop is None else stop):
+        page_text = reader.pages[index].extract_text()
+        if page_text.strip():
+            texts.append(page_text.strip())
+    return n_pages, texts
+
+
+def page_texts(stream: BinaryIO, start: int = 0, stop: Optional[int] = None) -> Tuple[int, List[str]]:
+    """Return (page count, stripped non-empty texts of pages [start, stop)) for a PDF stream."""
+    if pdfium is not None:
+        return _page_texts_pdfium(stream, start, stop)
+    return _page_texts_pypdf2(stream, start, stop)
+
+
+def count_pages(stream: BinaryIO) -> int:
+    """Return the number of pages in a PDF stream without extracting text."""
+    if pdfium is not None:
+        with _pdfium_lock:
+            pdf = pdfium.PdfDocument(stream)
+            try:
+                return len(pdf)
+            finally:
+                pdf.close()
+    return len(PyPDF2.PdfReader(stream).pages)
+
+
+def extract_page_range(data: bytes, start: int, stop: int) -> List[str]:
+    """Return the stripped, non-empty text of pages [start, stop); runs in a worker process."""
+    return page_texts(io.BytesIO(data), start, stop)[1]
+
+
+def get_pdf_executor() -> Optional[ProcessPoolExecutor]:
+    """Get or create the PDF worker pool (singleton); None when disabled in settings."""
+    global _pdf_executor
+    with _pdf_executor_lock:
+        if _pdf_executor is None and settings.pdf_extraction_workers > 0:
+            # spawn: forking a process that already runs server and executor threads is unsafe
+            _pdf_executor = ProcessPoolExecutor(
+                max_workers=settings.pdf_extraction_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            logger.info(f"Initialized PDF extraction pool, workers: {settings.pdf_extraction_workers}")
+        return _pdf_executor
+
+
+def extract_pages_parallel(data: bytes, n_pages: int) -> Optional[List[str]]:
+    """
+    Extract page texts across the worker pool, one contiguous page range per worker.
+
+    Returns None when the pool is disabled or fails, so callers fall back to
+    in-process extraction.
+    """
+    global _pdf_executor
+    executor = get_pdf_executor()
+    if executor is None:
+        return None
+    shard_count = min(settings.pdf_extraction_workers, n_pages)
+    bounds = [n_pages * i // shard_count for i in range(shard_count + 1)]
+    try:
+        futures = [
+            executor.submit(extract_page_range, data, bounds[i], bounds[i + 1])
+            for i in range(shard_count)
+        ]
+        return [text for future in futures for text in future.result()]
+    except Exception as e:  # noqa: BLE001
+        logger.warning(f"Parallel PDF extraction failed, falling back to in-process: {e}")
+        if isinstance(e, BrokenProcessPool):
+            # A dead worker poisons the pool; the next call starts a fresh one. Only this
+            # pool is dropped, in case another thread has already replaced it
+            with _pdf_executor_lock:
+                if _pdf_executor is executor:
+                    _pdf_executor = None
+            executor.shutdown(cancel_futures=True)
+        return None
+
+
+def close_pdf_executor() -> None:
+    """Stop the worker processes; called on app shutdown."""
+    global _pdf_executor
+    with _pdf_executor_lock:
+        executor, _pdf_executor = _pdf_executor, None
+    if executor is not None:
+        executor.shutdown(cancel_futures=True)
@@ -0,0 +1,83 @@
+"""
+Shared concurrency limit and retry policy for blocking LLM calls.
+
+Every async call site that invokes ``LLMEngine`` goes through ``run_llm`` (or
+``stream_llm`` for streamed answers) so that bursts of requests share one cap on
+in-flight provider calls instead of each endpoint fanning out independently and
+tripping provider 429s. Retries happen here only; the shared OpenAI client is
+created with ``max_retries=0``.
+"""
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Callable, Optional, Tuple
+
+from openai import APIConnectionError, APITimeoutError, RateLimitError
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+LLM_MAX_RETRIES = 3
+LLM_BACKOFF_SECONDS = 1.0
+_RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, APITimeoutError)
+
+# (event loop, semaphore); created on first use inside the running loop, because on
+# Python < 3.10 a semaphore binds to the loop current at construction time
+_llm_semaphore: Optional[Tuple[asyncio.AbstractEventLoop, asyncio.Semaphore]] = None
+
+
+def get_llm_semaphore() -> asyncio.Semaphore:
+    """Return the shared LLM semaphore for the running event loop (must be called from it)."""
+    global _llm_semaphore
+    loop = asyncio.get_running_loop()
+    if _llm_semaphore is None or _llm_semaphore[0] is not loop:
+        _llm_semaphore = (loop, asyncio.Semaphore(settings.llm_max_concurrency))
+    return _llm_semaphore[1]
+
+
+async def run_llm(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Run a blocking LLM call in a worker thread under the shared semaphore.
+
+    Transient provider errors (rate limits, connection errors, timeouts) are retried
+    with exponential backoff; the semaphore is released while backing off.
+    """
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        try:
+            async with get_llm_semaphore():
+                return await asyncio.to_thread(func, *args, **kwargs)
+        except _RETRYABLE_ERRORS as e:
+            if attempt == LLM_MAX_RETRIES:
+                raise
+            delay = LLM_BACKOFF_SECONDS * (2 ** attempt)
+            logger.warning(f"LLM call {getattr(func, '__name__', func)} retry {attempt + 1}/{LLM_MAX_RETRIES} in {delay:.1f}s: {e}")
+            await asyncio.sleep(delay)
+
+
+_STREAM_END = object()
+
+
+async def stream_llm(func: Callable[..., Any], *args: Any, **kwargs: Any) -> AsyncIterator[Any]:
+    """
+    Iterate a blocking LLM stream in worker threads, holding the shared semaphore until it ends.
+
+    Transient provider errors are retried like ``run_llm`` until the first item
+    arrives; after that they propagate, since part of the answer has been sent.
+    """
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        started = False
+        try:
+            async with get_llm_semaphore():
+                iterator = iter(await asyncio.to_thread(func, *args, **kwargs))
+                while True:
+                    item = await asyncio.to_thread(next, iterator, _STREAM_END)
+                    if item is _STREAM_END:
+                        return
+                    started = True
+                    yield item
+        except _RETRYABLE_ERRORS as e:
+            if started or attempt == LLM_MAX_RETRIES:
+                raise
+            delay = LLM_BACKOFF_SECONDS * (2 ** attempt)
+            logger.warning(f"LLM stream {getattr(func, '__name__', func)} retry {attempt + 1}/{LLM_MAX_RETRIES} in {delay:.1f}s: {e}")
+            await asyncio.sleep(delay)
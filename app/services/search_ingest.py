@@ -12,9 +12,12 @@ import numpy as np
 from openai import OpenAI
 
 from app.config import settings
+from app.services.http_client import get_http_client
 
 logger = logging.getLogger(__name__)
 
+CHUNK_ENCODE_THREADS = 4  # tiktoken worker threads for tokenizing a document's paragraphs
+
 _openai_client = None
 
 
@@ -22,7 +25,7 @@ def _get_openai_client():
     """Get or create the OpenAI client (singleton)."""
     global _openai_client
     if _openai_client is None:
-        _openai_client = OpenAI(api_key=settings.openai_api_key)
+        _openai_client = OpenAI(api_key=settings.openai_api_key, http_client=get_http_client())
         logger.info("✅ OpenAI embeddings client initialized (text-embedding-3-small)")
     return _openai_client
 
@@ -40,20 +43,20 @@ def chunk_text(text: str, file_id: str, filename: str, max_tokens: int = 600, ov
     # Bullets (lines starting with -, *, •, 1., etc.)
     
     # First, split into paragraphs
-    paragraphs = re.split(r'\n\s*\n', text)
+    paragraphs = [para.strip() for para in re.split(r'\n\s*\n', text)]
+    paragraphs = [para for para in paragraphs if para]
+    
+    # Tokenize every paragraph up front in one call; encode_batch runs BPE on
+    # tiktoken's Rust threads, so long documents use more than one core
+    para_token_counts = [len(tokens) for tokens in enc.encode_batch(paragraphs, num_threads=CHUNK_ENCODE_THREADS)]
     
     chunks = []
     current_chunk = []
     current_tokens = 0
+    last_para_tokens = 0
     position = 0
     
-    for para in paragraphs:
-        para = para.strip()
-        if not para:
-            continue
-            
-        para_tokens = len(enc.encode(para))
-        
+    for para, para_tokens in zip(paragraphs, para_token_counts):
         # If adding this paragraph would exceed max_tokens, save current chunk
         if current_tokens + para_tokens > max_tokens and current_chunk:
             chunk_text = "\n\n".join(current_chunk)
@@ -67,15 +70,16 @@ def chunk_text(text: str, file_id: str, filename: str, max_tokens: int = 600, ov
             position += 1
             
             # Keep last paragraph for overlap (if small enough)
-            if len(current_chunk) > 1 and len(enc.encode(current_chunk[-1])) < overlap_tokens:
+            if len(current_chunk) > 1 and last_para_tokens < overlap_tokens:
                 current_chunk = [current_chunk[-1]]
-                current_tokens = len(enc.encode(current_chunk[-1]))
+                current_tokens = last_para_tokens
             else:
                 current_chunk = []
                 current_tokens = 0
         
         current_chunk.append(para)
         current_tokens += para_tokens
+        last_para_tokens = para_tokens
     
     # Add final chunk
     if current_chunk:
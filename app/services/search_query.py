@@ -12,6 +12,7 @@ This module implements a lawyer-friendly, clause-centric search that:
 import re
 import logging
 import hashlib
+from functools import lru_cache
 from typing import List, Dict, Any, Optional, Tuple
 from collections import defaultdict
 
@@ -81,6 +82,7 @@ CONTRACT_TYPE_PHRASES = {
     },
 }
 
+@lru_cache(maxsize=2048)
 def detect_contract_type(query: str) -> Optional[str]:
     """
     Detect if query is asking for a specific contract type.
@@ -119,27 +121,36 @@ def is_phrase_hit(text: str, contract_type: str) -> bool:
 # Helper Functions
 # ============================================================================
 
-def tokenize_query(query: str) -> List[str]:
+@lru_cache(maxsize=2048)
+def tokenize_query(query: str) -> Tuple[str, ...]:
     """
     Tokenize query into words (lowercased, split on whitespace/punctuation).
     
+    Memoized: called once per clause with the same query when building snippets.
+    
     Args:
         query: Search query string
         
     Returns:
-        List of lowercased word tokens (filtered to meaningful words > 2 chars)
+        Tuple of lowercased word tokens (filtered to meaningful words > 2 chars)
     """
     # Split on whitespace and punctuation, lowercase, filter short words
     tokens = re.findall(r'\b\w+\b', query.lower())
-    return [t for t in tokens if len(t) > 2]
+    return tuple(t for t in tokens if len(t) > 2)
+
+
+@lru_cache(maxsize=2048)
+def _clause_words(clause_text: str) -> frozenset:
+    """Distinct lowercased words in a clause; chunks recur across queries, so memoized."""
+    return frozenset(re.findall(r'\b\w+\b', clause_text.lower()))
 
 
-def compute_keyword_features(query_tokens: List[str], clause_text: str) -> Tuple[int, float]:
+def compute_keyword_features(query_tokens: Tuple[str, ...], clause_text: str) -> Tuple[int, float]:
     """
     Compute keyword overlap and density for a clause.
     
     Args:
-        query_tokens: List of lowercased query word tokens
+        query_tokens: Lowercased query word tokens
         clause_text: Full clause/chunk text
         
     Returns:
@@ -147,8 +158,7 @@ def compute_keyword_features(query_tokens: List[str], clause_text: str) -> Tuple
         - keyword_overlap: Number of query tokens found in clause (capped at 5)
         - keyword_density: keyword_overlap / (clause_word_count + 1)
     """
-    clause_lower = clause_text.lower()
-    clause_words = set(re.findall(r'\b\w+\b', clause_lower))
+    clause_words = _clause_words(clause_text)
     
     # Count how many query tokens appear in clause
     overlap = sum(1 for token in query_tokens if token in clause_words)
@@ -381,14 +391,14 @@ def search_and_group(
     5. Filter by thresholds (doc_score >= 0.5, clause_score >= 0.45)
     6. Apply phrase-hit filtering for contract-type queries
     7. Extract clause snippets
-    8. Optionally generate LLM summaries per clause
+    8. Optionally mark clauses for LLM summaries (generated by the caller)
     
     Args:
         vector_store: VectorStore instance for search
         query: Search query string
         top_k_groups: Number of file groups to return (overridden by MAX_FILES_RETURNED)
         max_snippets_per_group: Maximum clauses per file group (overridden by MAX_CLAUSES_PER_FILE)
-        enable_clause_summaries: Whether to generate LLM summaries (costly)
+        enable_clause_summaries: Whether to mark top clauses for LLM summaries (costly)
         
     Returns:
         List of file groups, each containing:
@@ -552,7 +562,6 @@ def search_and_group(
     
     # 8. Build clause hits with snippets and optional summaries
     results = []
-    clause_summary_cache = {}  # Cache for clause summaries: hash -> summary
     
     for group in filtered_groups:
         filename = group["filename"]
@@ -582,29 +591,12 @@ def search_and_group(
             # Truncate clause text before sending to UI
             truncated_content = truncate_clause_text(content)
             
-            # Optional: Generate clause summary (cached) - only for top N clauses
-            clause_summary = None
+            # Optional: mark top N clauses for an LLM summary. The caller generates them
+            # through the shared LLM limiter; identical clauses share one key (and one call)
+            summary_key = None
             if enable_clause_summaries and clause_idx < max_summaries:
-                # Create cache key from stable identifiers
                 cache_key_parts = [filename, section_title or "", content[:200]]  # Use first 200 chars
-                cache_key = hashlib.md5("|".join(cache_key_parts).encode()).hexdigest()
-                
-                if cache_key in clause_summary_cache:
-                    clause_summary = clause_summary_cache[cache_key]
-                    logger.debug(f"Using cached clause summary for clause {clause_idx+1}")
-                else:
-                    # Generate summary via LLM (lazy import to avoid circular dependency)
-                    try:
-                        from app.services.llm_engine import LLMEngine
-                        clause_summary = LLMEngine.summarize_clause(
-                            clause_text=content,
-                            max_words=CLAUSE_SUMMARY_MAX_WORDS
-                        )
-                        clause_summary_cache[cache_key] = clause_summary
-                        logger.debug(f"Generated clause summary for clause {clause_idx+1}: {clause_summary[:50]}...")
-                    except Exception as e:
-                        logger.warning(f"Failed to generate clause summary: {e}")
-                        clause_summary = None
+                summary_key = hashlib.md5("|".join(cache_key_parts).encode()).hexdigest()
             
             clause_hit = {
                 "file_name": filename,
@@ -615,10 +607,11 @@ def search_and_group(
                 "similarity_score": score,
                 "match_type": match_type,
                 "chunk_index": chunk_index,
-                "clause_summary": clause_summary,
+                "clause_summary": None,  # Filled by the caller for clauses with a _summary_key
                 "display_clause_score": score,  # For UI display (can be made optional)
                 "clause_type": clause_type,  # Primary clause type for clustering
-                "_original_content": content  # Store original content for summary generation (not sent to UI)
+                "_original_content": content,  # Store original content for summary generation (not sent to UI)
+                "_summary_key": summary_key,  # Set when a clause summary is wanted (not sent to UI)
             }
             
             clause_hits.append(clause_hit)
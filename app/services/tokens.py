@@ -0,0 +1,61 @@
+"""Token counting for GPT-4o prompts (cl100k_base), shared by context assembly and prompt building."""
+from __future__ import annotations
+
+from typing import List
+import logging
+
+import tiktoken
+
+from app.services.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Token encoder for GPT-4o (cl100k_base encoding)
+_token_encoder = None
+_token_encoder_failed = False
+
+# Retrieved chunks repeat across queries, so counts are memoized by content
+_token_counts = TTLCache(capacity=8192, ttl=86400)
+TOKEN_COUNT_THREADS = 4
+
+
+def _get_token_encoder():
+    """Get or create the token encoder (singleton)."""
+    global _token_encoder
+    if _token_encoder is None:
+        _token_encoder = tiktoken.get_encoding("cl100k_base")
+    return _token_encoder
+
+
+def _encode_lengths(texts: List[str]) -> List[int]:
+    """Token lengths for non-empty texts, falling back to 4 chars per token without an encoder."""
+    global _token_encoder_failed
+    if not _token_encoder_failed:
+        try:
+            encoder = _get_token_encoder()
+            if len(texts) == 1:
+                return [len(encoder.encode(texts[0]))]
+            # encode_batch runs BPE on Rust threads without holding the GIL
+            return [len(tokens) for tokens in encoder.encode_batch(texts, num_threads=TOKEN_COUNT_THREADS)]
+        except Exception as e:
+            # Remember the failure so an offline worker does not retry the download per chunk
+            _token_encoder_failed = True
+            logger.warning(f"Token counting failed: {e}, falling back to character estimate")
+    # Fallback: approximate 1 token = 4 characters
+    return [len(text) // 4 for text in texts]
+
+
+def count_tokens_batch(texts: List[str]) -> List[int]:
+    """Count tokens for several texts, encoding only the ones not seen before in one batch."""
+    counts = {text: _token_counts.get(text) for text in texts if text}
+    missing = [text for text, count in counts.items() if count is None]
+    if missing:
+        for text, count in zip(missing, _encode_lengths(missing)):
+            counts[text] = count
+            _token_counts.set(text, count)
+    return [counts[text] if text else 0 for text in texts]
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens in text using GPT-4o encoding."""
+    return count_tokens_batch([text])[0]
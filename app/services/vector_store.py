@@ -1,15 +1,20 @@
 """Vector database service for document embeddings and similarity search.
 Uses OpenAI embeddings (text-embedding-3-small) for all vector operations.
 """
-from typing import List, Dict, Any, Optional, Tuple
+from typing import Callable, Iterable, Iterator, List, Dict, Any, Optional, Tuple
+from concurrent.futures import Future
+from collections import OrderedDict
 from datetime import datetime
+import itertools
 import logging
 import os
+import threading
 import chromadb
 from chromadb.config import Settings
 from openai import OpenAI
 
 from app.config import settings
+from app.services.http_client import get_http_client
 
 
 logger = logging.getLogger(__name__)
@@ -18,6 +23,185 @@ logger = logging.getLogger(__name__)
 _chroma_client = None
 _openai_client = None
 
+EMBEDDING_BATCH_SIZE = 64  # Chunks per embeddings request when ingesting
+
+# Recent query embeddings (query -> embedding), shared across VectorStore instances
+_QUERY_EMBEDDING_CACHE_SIZE = 256
+_query_embedding_cache: "OrderedDict[str, List[float]]" = OrderedDict()
+_query_embedding_lock = threading.Lock()
+
+QUERY_EMBEDDING_BATCH_SIZE = 32  # Max concurrent query embeddings coalesced into one request
+QUERY_EMBEDDING_MAX_WAIT = 0.01  # Seconds the first caller waits for others to join its batch
+
+
+class _QueryEmbeddingBatcher:
+    """
+    Coalesce concurrent query embeddings into single embeddings requests.
+    
+    Callers block in ``embed``. One caller at a time is the leader: it waits up to
+    ``max_wait`` for others to queue (or until ``max_batch`` are queued), then sends
+    batches from the front of the queue until its own query is embedded, while the
+    rest wait on their futures. It then steps down and a caller still queued takes
+    over, so no caller's latency grows with the load behind it.
+    Thread-based because queries are embedded from worker threads.
+    """
+    
+    def __init__(self, embed_batch: Callable[[List[str]], List[List[float]]], max_batch: int, max_wait: float):
+        self.embed_batch = embed_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._pending: List[Tuple[str, Future]] = []
+        self._cond = threading.Condition()
+        self._draining = False
+    
+    def embed(self, text: str) -> List[float]:
+        future: Future = Future()
+        with self._cond:
+            self._pending.append((text, future))
+            if len(self._pending) >= self.max_batch:
+                self._cond.notify_all()
+            # Wait for a result, or for leadership to free up while still queued
+            while not future.done() and self._draining:
+                self._cond.wait()
+            leader = not future.done()
+            if leader:
+                self._draining = True
+        if leader:
+            self._lead(future)
+        return future.result()
+    
+    def _lead(self, own: Future) -> None:
+        with self._cond:
+            self._cond.wait_for(lambda: len(self._pending) >= self.max_batch, self.max_wait)
+        try:
+            # Batches are taken in FIFO order, so our own entry is always still queued here
+            while not own.done():
+                with self._cond:
+                    batch = self._pending[:self.max_batch]
+                    del self._pending[:self.max_batch]
+                self._send(batch)
+                with self._cond:
+                    self._cond.notify_all()
+        finally:
+            with self._cond:
+                self._draining = False
+                self._cond.notify_all()
+    
+    def _send(self, batch: List[Tuple[str, Future]]) -> None:
+        # Identical queries in one burst share a single input
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        try:
+            by_text = dict(zip(texts, self.embed_batch(texts)))
+        except Exception as e:  # noqa: BLE001
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        if len(batch) > 1:
+            logger.debug(f"Embedded {len(texts)} queries for {len(batch)} callers in one request")
+        for text, future in batch:
+            future.set_result(by_text[text])
+
+# Monotonic counter bumped on every write to the collection; keys caches of derived data
+_index_version = 0
+
+
+# Callbacks run after every bump, from the thread that made the write (e.g. to invalidate shared caches)
+_index_change_listeners: List[Callable[[], None]] = []
+
+
+def _bump_index_version() -> None:
+    """Invalidate caches derived from collection contents."""
+    global _index_version
+    _index_version += 1
+    for listener in _index_change_listeners:
+        try:
+            listener()
+        except Exception as e:  # noqa: BLE001
+            logger.warning(f"Index change listener failed: {e}")
+
+
+def add_index_change_listener(listener: Callable[[], None]) -> None:
+    """Register a callback run after every write to the collection."""
+    _index_change_listeners.append(listener)
+
+
+def index_version() -> int:
+    """Return the current index version without resolving a VectorStore instance."""
+    return _index_version
+
+
+# Per-file chunk counts and inventory fields keyed by (file_id, file_name), maintained incrementally on writes.
+# None until first requested, then bootstrapped with a paged metadata scan that keeps
+# only counters, so peak memory scales with the number of files rather than chunks.
+_file_summary: Optional[Dict[Tuple[str, str], Dict[str, Any]]] = None
+_SUMMARY_SCAN_PAGE_SIZE = 1000
+_file_summary_lock = threading.Lock()
+
+
+# (index version, stats) for get_collection_stats; recomputed when the version changes
+_collection_stats_cache: Optional[Tuple[int, Dict[str, Any]]] = None
+
+# (index version, inventory) for get_inventory; writers bump the version after updating the summary
+_inventory_cache: Optional[Tuple[int, List[Dict[str, Any]]]] = None
+
+
+def _invalidate_file_summary() -> None:
+    """Drop the per-file summary so the next request rebuilds it from the collection."""
+    global _file_summary
+    with _file_summary_lock:
+        _file_summary = None
+
+
+def _update_file_summary(
+    before: Optional[Dict[Tuple[str, str], Dict[str, Any]]],
+    update: Callable[[Dict[Tuple[str, str], Dict[str, Any]]], None],
+) -> None:
+    """
+    Apply a write's incremental change to the per-file summary.
+    
+    ``before`` is the summary seen before the collection write. If a bootstrap scan
+    replaced it while the write was landing, that scan may have counted the written
+    rows already (or skipped others as its pages shifted), so the summary is dropped
+    to be rebuilt instead of updated.
+    """
+    global _file_summary
+    with _file_summary_lock:
+        if _file_summary is None:
+            return
+        if _file_summary is before:
+            update(_file_summary)
+        else:
+            _file_summary = None
+
+
+def _summary_key(metadata: Dict[str, Any]) -> Tuple[str, str]:
+    file_name = metadata.get('file_name', 'Unknown')
+    return metadata.get('file_id', file_name), file_name
+
+
+def _record_chunk(summary: Dict[Tuple[str, str], Dict[str, Any]], metadata: Dict[str, Any]) -> None:
+    """Count one chunk towards its file's summary entry."""
+    key = _summary_key(metadata)
+    entry = summary.get(key)
+    if entry is None:
+        summary[key] = {
+            "file_id": key[0],
+            "filename": key[1],
+            "chunk_count": 1,
+            "source": metadata.get("source", "local"),
+            "time_modified": metadata.get("time_modified"),
+            "file_size": metadata.get("file_size") or 0,
+            "file_path": metadata.get("file_path", ""),
+            "author": metadata.get("author", "Unknown"),
+            # Only set on chunks indexed by older ingestion code; kept for /documents/local
+            "server_relative_url": metadata.get("server_relative_url", ""),
+            "time_last_modified": metadata.get("time_last_modified"),
+        }
+    else:
+        entry["chunk_count"] += 1
+        if not entry["time_modified"]:
+            entry["time_modified"] = metadata.get("time_modified")
+
 
 def _get_chroma_client():
     """Get or create the ChromaDB client (singleton)."""
@@ -35,7 +219,7 @@ def _get_openai_client():
     """Get or create the OpenAI client (singleton)."""
     global _openai_client
     if _openai_client is None:
-        _openai_client = OpenAI(api_key=settings.openai_api_key)
+        _openai_client = OpenAI(api_key=settings.openai_api_key, http_client=get_http_client())
         logger.info("✅ OpenAI embeddings client initialized (text-embedding-3-small)")
     return _openai_client
 
@@ -56,9 +240,16 @@ class VectorStore:
         
         # Use OpenAI for embeddings
         self.openai_client = _get_openai_client()
+        self._query_batcher = _QueryEmbeddingBatcher(
+            self._embed_texts, QUERY_EMBEDDING_BATCH_SIZE, QUERY_EMBEDDING_MAX_WAIT
+        )
         
         logger.info("VectorStore ready (using OpenAI embeddings)")
     
+    def version(self) -> int:
+        """Return the index version, which changes whenever documents are added, renamed, or removed."""
+        return index_version()
+    
     def add_document(self, doc_id: str, text: str, metadata: Dict[str, Any]) -> None:
         """
         Add a document chunk to the vector store.
@@ -77,12 +268,15 @@ class VectorStore:
             embedding = response.data[0].embedding
             
             # Store in ChromaDB
+            summary_before = _file_summary
             self.collection.add(
                 embeddings=[embedding],
                 documents=[text],
                 metadatas=[metadata],
                 ids=[doc_id]
             )
+            _update_file_summary(summary_before, lambda summary: _record_chunk(summary, metadata))
+            _bump_index_version()
             
             logger.debug(f"Added document to vector store, doc_id: {doc_id}, text_length: {len(text)}")
             
@@ -90,6 +284,95 @@ class VectorStore:
             logger.error(f"Failed to add document to vector store, doc_id: {doc_id}, error: {str(e)}")
             raise
     
+    def add_document_stream(
+        self,
+        chunks: Iterable[Tuple[str, str, Dict[str, Any]]],
+        batch_size: int = EMBEDDING_BATCH_SIZE,
+    ) -> int:
+        """
+        Add (doc_id, text, metadata) chunks from an iterable, one batch at a time.
+        
+        Only the current batch is materialized, so a generator of chunks keeps peak
+        memory bounded regardless of document size.
+        
+        Args:
+            chunks: Iterable of (doc_id, text, metadata) tuples
+            batch_size: Number of chunks per embeddings request
+            
+        Returns:
+            Number of chunks added
+        """
+        added = 0
+        iterator = iter(chunks)
+        try:
+            while True:
+                batch = list(itertools.islice(iterator, batch_size))
+                if not batch:
+                    break
+                batch_ids = [doc_id for doc_id, _, _ in batch]
+                batch_texts = [text for _, text, _ in batch]
+                batch_metadatas = [metadata for _, _, metadata in batch]
+                
+                embeddings = self._embed_texts(batch_texts)
+                
+                summary_before = _file_summary
+                self.collection.add(
+                    embeddings=embeddings,
+                    documents=batch_texts,
+                    metadatas=batch_metadatas,
+                    ids=batch_ids
+                )
+                
+                def record_batch(summary: Dict[Tuple[str, str], Dict[str, Any]]) -> None:
+                    for metadata in batch_metadatas:
+                        _record_chunk(summary, metadata)
+                
+                _update_file_summary(summary_before, record_batch)
+                _bump_index_version()
+                added += len(batch)
+            
+            logger.debug(f"Added {added} documents to vector store in batches of {batch_size}")
+            return added
+            
+        except Exception as e:
+            logger.error(f"Failed to add documents to vector store after {added} chunks, error: {str(e)}")
+            raise
+    
+    def _embed_texts(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts with one embeddings request, returning vectors in input order."""
+        response = self.openai_client.embeddings.create(
+            model="text-embedding-3-small",
+            input=texts
+        )
+        return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+    
+    def embed_query(self, query: str) -> List[float]:
+        """
+        Embed a query string, reusing the embedding for recently seen queries.
+        
+        Cache misses from concurrent requests are coalesced into one embeddings request.
+        
+        Args:
+            query: Query text to embed
+            
+        Returns:
+            Embedding vector (text-embedding-3-small)
+        """
+        with _query_embedding_lock:
+            cached = _query_embedding_cache.get(query)
+            if cached is not None:
+                _query_embedding_cache.move_to_end(query)
+                return cached
+        
+        embedding = self._query_batcher.embed(query)
+        
+        with _query_embedding_lock:
+            _query_embedding_cache[query] = embedding
+            _query_embedding_cache.move_to_end(query)
+            if len(_query_embedding_cache) > _QUERY_EMBEDDING_CACHE_SIZE:
+                _query_embedding_cache.popitem(last=False)
+        return embedding
+    
     def search_similar(self, query: str, n_results: int = 10, where: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """
         Search for similar documents using vector similarity.
@@ -103,12 +386,8 @@ class VectorStore:
             List of similar documents with metadata and scores
         """
         try:
-            # Generate query embedding via OpenAI
-            response = self.openai_client.embeddings.create(
-                model="text-embedding-3-small",
-                input=query
-            )
-            query_embedding = response.data[0].embedding
+            # Generate query embedding via OpenAI (cached for repeated queries)
+            query_embedding = self.embed_query(query)
             
             # Search in ChromaDB
             results = self.collection.query(
@@ -145,7 +424,7 @@ class VectorStore:
             file_name: Name of the file to search for
             
         Returns:
-            List of document chunks for the file
+            List of document chunks for the file, ordered by chunk_index
         """
         try:
             results = self.collection.get(
@@ -163,6 +442,12 @@ class VectorStore:
                     }
                     formatted_results.append(result)
             
+            # Chroma returns chunks in insertion order, which is already chunk order for
+            # sequentially ingested files; only sort when that does not hold
+            indices = [r['metadata'].get('chunk_index', 0) for r in formatted_results]
+            if any(a > b for a, b in zip(indices, indices[1:])):
+                formatted_results.sort(key=lambda r: r['metadata'].get('chunk_index', 0))
+            
             logger.info(f"File search completed, file_name: {file_name}, chunks: {len(formatted_results)}")
             return formatted_results
             
@@ -170,6 +455,58 @@ class VectorStore:
             logger.error(f"Failed to search by file, file_name: {file_name}, error: {str(e)}")
             raise
     
+    def search_by_files(self, file_names: List[str], per_file_limit: int) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Get the leading chunks of several files with one collection query.
+        
+        Args:
+            file_names: Names of the files to fetch
+            per_file_limit: Maximum number of chunks to return per file
+            
+        Returns:
+            Dictionary mapping each requested file name to its first chunks, ordered by
+            chunk_index as in search_by_file (empty list when the file has no chunks)
+        """
+        try:
+            by_file: Dict[str, List[Dict[str, Any]]] = {name: [] for name in file_names}
+            if not file_names or per_file_limit <= 0:
+                return by_file
+            
+            # Filter on chunk_index so only each file's leading chunks are materialized
+            results = self.collection.get(
+                where={"$and": [
+                    {"file_name": {"$in": list(file_names)}},
+                    {"chunk_index": {"$lt": per_file_limit}},
+                ]},
+                include=['metadatas', 'documents']
+            )
+            
+            ids = results.get('ids') or []
+            documents = results.get('documents') or []
+            metadatas = results.get('metadatas') or []
+            for i, doc in enumerate(documents):
+                metadata = metadatas[i] if metadatas else {}
+                bucket = by_file.get(metadata.get('file_name'))
+                if bucket is not None:
+                    bucket.append({'id': ids[i], 'content': doc, 'metadata': metadata})
+            
+            for name, chunks in by_file.items():
+                if not chunks:
+                    # Chunks indexed without chunk_index are not matched by the filter
+                    chunks.extend(self.search_by_file(name)[:per_file_limit])
+                    continue
+                indices = [c['metadata'].get('chunk_index', 0) for c in chunks]
+                if any(a > b for a, b in zip(indices, indices[1:])):
+                    chunks.sort(key=lambda c: c['metadata'].get('chunk_index', 0))
+                del chunks[per_file_limit:]
+            
+            logger.info(f"Multi-file search completed, files: {len(file_names)}, chunks: {sum(len(c) for c in by_file.values())}")
+            return by_file
+            
+        except Exception as e:
+            logger.error(f"Failed to search by files, file_names: {file_names}, error: {str(e)}")
+            raise
+    
     def search_by_metadata(self, metadata_filter: Dict[str, Any], n_results: int = 50) -> List[Dict[str, Any]]:
         """
         Search documents by metadata filters.
@@ -218,12 +555,20 @@ class VectorStore:
         try:
             # Get all chunk IDs for the file
             # Note: ChromaDB always returns IDs, so we don't need to include them
+            summary_before = _file_summary
             results = self.collection.get(
                 where={"file_name": file_name}
             )
             
             if results.get('ids') and len(results['ids']) > 0:
                 self.collection.delete(ids=results['ids'])
+                
+                def drop_file(summary: Dict[Tuple[str, str], Dict[str, Any]]) -> None:
+                    for key in [k for k in summary if k[1] == file_name]:
+                        del summary[key]
+                
+                _update_file_summary(summary_before, drop_file)
+                _bump_index_version()
                 deleted_count = len(results['ids'])
                 logger.info(f"Deleted document chunks, file_name: {file_name}, count: {deleted_count}")
                 return deleted_count
@@ -269,6 +614,8 @@ class VectorStore:
                     metadatas=[updated_metadata]
                 )
                 updated_count += 1
+            _invalidate_file_summary()
+            _bump_index_version()
             
             logger.info(f"Renamed document, old_name: {old_file_name}, new_name: {new_file_name}, chunks_updated: {updated_count}")
             return updated_count
@@ -284,49 +631,150 @@ class VectorStore:
         Returns:
             Dictionary with collection statistics
         """
+        global _collection_stats_cache
         try:
-            count_result = self.collection.count()
-            total_documents = count_result
+            version = _index_version
+            if _collection_stats_cache is not None and _collection_stats_cache[0] == version:
+                # Callers add keys to the result, so hand out a copy
+                return dict(_collection_stats_cache[1])
             
-            # Get sample of metadata to analyze
-            sample_results = self.collection.get(
-                limit=100,
-                include=['metadatas']
-            )
+            # Aggregate over the per-file summary rather than sampling chunk metadata
+            with _file_summary_lock:
+                entries = [(d["filename"], d["chunk_count"]) for d in self._load_file_summary().values()]
             
-            # Analyze file types
+            # Analyze file types (counted per chunk)
             file_types = {}
             unique_files = set()
-            
-            if sample_results['metadatas']:
-                for metadata in sample_results['metadatas']:
-                    file_name = metadata.get('file_name', '')
-                    unique_files.add(file_name)
-                    
-                    if '.' in file_name:
-                        ext = file_name.split('.')[-1].lower()
-                        file_types[ext] = file_types.get(ext, 0) + 1
+            for file_name, chunk_count in entries:
+                unique_files.add(file_name)
+                if '.' in file_name:
+                    ext = file_name.split('.')[-1].lower()
+                    file_types[ext] = file_types.get(ext, 0) + chunk_count
             
             stats = {
-                'total_chunks': total_documents,
+                'total_chunks': self.collection.count(),
                 'unique_files': len(unique_files),
                 'file_types': file_types,
                 'collection_name': self.collection.name
             }
+            _collection_stats_cache = (version, stats)
             
             logger.info(f"Retrieved collection stats: {stats}")
-            return stats
+            return dict(stats)
             
         except Exception as e:
             logger.error(f"Failed to get collection stats, error: {str(e)}")
             raise
     
+    def _iter_metadatas(self) -> Iterator[Optional[Dict[str, Any]]]:
+        """Yield every chunk's metadata, fetching the collection one page at a time."""
+        offset = 0
+        while True:
+            page = self.collection.get(limit=_SUMMARY_SCAN_PAGE_SIZE, offset=offset, include=['metadatas'])
+            metadatas = page.get('metadatas') or []
+            yield from metadatas
+            if len(metadatas) < _SUMMARY_SCAN_PAGE_SIZE:
+                return
+            offset += _SUMMARY_SCAN_PAGE_SIZE
+    
+    def _load_file_summary(self) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        """Return the per-file summary, bootstrapping it from a paged metadata scan. Caller holds _file_summary_lock."""
+        global _file_summary
+        if _file_summary is None:
+            summary: Dict[Tuple[str, str], Dict[str, Any]] = {}
+            for md in self._iter_metadatas():
+                _record_chunk(summary, md or {})
+            _file_summary = summary
+        return _file_summary
+    
+    def list_filenames(self) -> List[str]:
+        """
+        Get the sorted unique filenames in the store from the per-file summary.
+        
+        Returns:
+            Sorted list of file names
+        """
+        try:
+            with _file_summary_lock:
+                names = {filename for _, filename in self._load_file_summary()}
+            return sorted(name for name in names if name)
+            
+        except Exception as e:
+            logger.error(f"Failed to list filenames, error: {str(e)}")
+            raise
+    
+    def index_summary(self) -> Dict[str, Any]:
+        """
+        Get total chunk count and per-file chunk counts without rescanning metadata.
+        
+        The per-file table is built from one metadata scan on first use and then kept
+        current by add_document/add_document_stream/delete_document_chunks.
+        
+        Returns:
+            Dictionary with:
+            - total_chunks: Number of chunks in the collection
+            - documents: List of {file_id, filename, chunk_count, source}, sorted by filename
+        """
+        try:
+            with _file_summary_lock:
+                summary = self._load_file_summary()
+                documents = sorted(
+                    (
+                        {"file_id": d["file_id"], "filename": d["filename"], "chunk_count": d["chunk_count"], "source": d["source"]}
+                        for d in summary.values()
+                    ),
+                    key=lambda d: d["filename"],
+                )
+            
+            return {
+                "total_chunks": self.collection.count(),
+                "documents": documents,
+            }
+            
+        except Exception as e:
+            logger.error(f"Failed to get index summary, error: {str(e)}")
+            raise
+    
+    def list_files(self) -> List[Dict[str, Any]]:
+        """
+        Get one entry per filename from the per-file summary, in indexing order.
+        
+        Returns:
+            List of {filename, file_path, server_relative_url, time_modified,
+            time_last_modified, author, file_size, chunk_count}; descriptive fields
+            come from the first indexed chunk of the file
+        """
+        try:
+            files: Dict[str, Dict[str, Any]] = {}
+            with _file_summary_lock:
+                for entry in self._load_file_summary().values():
+                    item = files.get(entry["filename"])
+                    if item is None:
+                        files[entry["filename"]] = {
+                            "filename": entry["filename"],
+                            "file_path": entry["file_path"],
+                            "server_relative_url": entry["server_relative_url"],
+                            "time_modified": entry["time_modified"] or "",
+                            "time_last_modified": entry["time_last_modified"],
+                            "author": entry["author"],
+                            "file_size": entry["file_size"],
+                            "chunk_count": entry["chunk_count"],
+                        }
+                    else:
+                        item["chunk_count"] += entry["chunk_count"]
+            return list(files.values())
+            
+        except Exception as e:
+            logger.error(f"Failed to list files, error: {str(e)}")
+            raise
+    
     def get_inventory(self) -> List[Dict[str, Any]]:
         """
         Get inventory of all files in the vector store.
         
-        This is essentially a metadata search that aggregates chunks by filename,
-        providing a summary of indexed documents.
+        Aggregates the per-file summary by filename, providing a summary of indexed
+        documents without rescanning chunk metadata. The result is reused until the
+        next write to the collection; treat the returned items as read-only.
         
         Returns:
             List of dictionaries with file information:
@@ -335,39 +783,40 @@ class VectorStore:
             - last_indexed: ISO timestamp of last modification
             - size: File size in bytes
         """
+        global _inventory_cache
         try:
-            data = self.collection.get(limit=10000, include=["metadatas"])
+            version = _index_version
+            if _inventory_cache is not None and _inventory_cache[0] == version:
+                return list(_inventory_cache[1])
             
+            # Derived from the incrementally maintained per-file summary: O(files), no metadata scan
             inv: Dict[str, Dict[str, Any]] = {}
-            for md in (data.get("metadatas") or []):
-                if not md:
-                    continue
-                fname = md.get("file_name")
-                if not fname:
+            with _file_summary_lock:
+                entries = [dict(d) for d in self._load_file_summary().values()]
+            for entry in entries:
+                fname = entry["filename"]
+                if not fname or fname == "Unknown":
                     continue
-                    
+                
                 item = inv.get(fname)
                 if not item:
                     item = {
                         "filename": fname,
                         "chunks_or_pages": 0,
-                        "last_indexed": self._safe_iso(md.get("time_modified")),
-                        "size": md.get("file_size") or 0,
+                        "last_indexed": self._safe_iso(entry["time_modified"]),
+                        "size": entry["file_size"],
                     }
                     inv[fname] = item
-                    
-                item["chunks_or_pages"] = int(item.get("chunks_or_pages", 0)) + 1
                 
-                # Update last_indexed to the most recent if available
-                lm = md.get("time_modified")
-                if lm:
-                    cur = item.get("last_indexed")
-                    if not cur:
-                        item["last_indexed"] = self._safe_iso(lm)
-                        
+                # The same filename can be indexed under several file_ids
+                item["chunks_or_pages"] += entry["chunk_count"]
+                if not item["last_indexed"]:
+                    item["last_indexed"] = self._safe_iso(entry["time_modified"])
+            
             result = list(inv.values())
+            _inventory_cache = (version, result)
             logger.info(f"Retrieved inventory: {len(result)} files")
-            return result
+            return list(result)
             
         except Exception as e:
             logger.error(f"Failed to get inventory, error: {str(e)}")
@@ -434,6 +883,8 @@ class VectorStore:
                 name="legal_documents",
                 metadata={"hnsw:space": "cosine"}
             )
+            _invalidate_file_summary()
+            _bump_index_version()
             logger.info("Vector store reset: collection recreated with zero documents")
             return {"status": "success", "total_chunks": 0, "unique_files": 0}
         except Exception as e:
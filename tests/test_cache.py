@@ -0,0 +1,123 @@
+"""Unit tests for the in-process LRU + TTL cache."""
+
+import types
+
+import pytest
+
+from app.services import cache as cache_module
+from app.services.cache import TTLCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable stand-in for time.monotonic as seen by the cache module."""
+    now = [1000.0]
+    monkeypatch.setattr(cache_module, "time", types.SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def test_get_returns_stored_value_and_none_on_miss(clock):
+    cache = TTLCache(capacity=4, ttl=60)
+    cache.set("a", 1)
+
+    assert cache.get("a") == 1
+    assert cache.get("missing") is None
+
+
+def test_evicts_least_recently_used_when_full(clock):
+    cache = TTLCache(capacity=3, ttl=60)
+    for key in ("a", "b", "c"):
+        cache.set(key, key.upper())
+
+    cache.set("d", "D")
+
+    assert cache.get("a") is None
+    assert [key for key, _ in cache.items()] == ["b", "c", "d"]
+
+
+def test_get_refreshes_recency(clock):
+    cache = TTLCache(capacity=3, ttl=60)
+    for key in ("a", "b", "c"):
+        cache.set(key, key.upper())
+
+    assert cache.get("a") == "A"
+    cache.set("d", "D")
+
+    assert cache.get("b") is None
+    assert [key for key, _ in cache.items()] == ["c", "a", "d"]
+
+
+def test_set_overwrites_and_refreshes_recency(clock):
+    cache = TTLCache(capacity=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+
+    cache.set("a", 10)
+    cache.set("c", 3)
+
+    assert cache.get("a") == 10
+    assert cache.get("b") is None
+    assert len(cache) == 2
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = TTLCache(capacity=4, ttl=60)
+    cache.set("a", 1)
+
+    clock[0] += 59
+    assert cache.get("a") == 1
+    clock[0] += 1
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_set_restarts_ttl(clock):
+    cache = TTLCache(capacity=4, ttl=60)
+    cache.set("a", 1)
+    clock[0] += 50
+    cache.set("a", 2)
+    clock[0] += 50
+
+    assert cache.get("a") == 2
+
+
+def test_items_skips_expired_entries_without_touching_recency(clock):
+    cache = TTLCache(capacity=4, ttl=60)
+    cache.set("old", 1)
+    clock[0] += 30
+    cache.set("new", 2)
+    clock[0] += 40
+
+    assert cache.items() == [("new", 2)]
+    cache.set("x", 3)
+    assert [key for key, _ in cache.items()] == ["new", "x"]
+
+
+def test_get_stale_serves_expired_entries_within_grace(clock):
+    cache = TTLCache(capacity=4, ttl=60, stale_grace=30)
+    cache.set("a", 1)
+
+    assert cache.get_stale("a") == (1, False)
+    clock[0] += 60
+    assert cache.get_stale("a") == (1, True)
+    assert cache.get("a") is None
+    clock[0] += 29
+    assert cache.get_stale("a") == (1, True)
+
+
+def test_get_stale_drops_entries_past_grace(clock):
+    cache = TTLCache(capacity=4, ttl=60, stale_grace=30)
+    cache.set("a", 1)
+
+    clock[0] += 90
+    assert cache.get_stale("a") is None
+    assert len(cache) == 0
+
+
+def test_stale_entries_are_excluded_from_items(clock):
+    cache = TTLCache(capacity=4, ttl=60, stale_grace=30)
+    cache.set("a", 1)
+    clock[0] += 70
+
+    assert cache.items() == []
+    assert cache.get_stale("a") == (1, True)
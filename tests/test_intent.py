@@ -0,0 +1,70 @@
+"""Unit tests for keyword-based intent shortcuts."""
+
+import pytest
+
+from app.services import intent
+from app.services.intent import _command_intent, _keyword_fallback
+
+
+@pytest.mark.parametrize("query", [
+    "list files",
+    "List the documents loaded?",
+    "please list files",
+    "show me all documents",
+    "what files are loaded",
+    "What documents do you have?",
+    "What's indexed?",
+    "  list files please  ",
+])
+def test_whole_query_inventory_commands(query):
+    assert _command_intent(query) == "inventory"
+
+
+@pytest.mark.parametrize("query", [
+    "what can you do?",
+    "What are your capabilities?",
+    "Features",
+    "show me your features",
+    "help",
+])
+def test_whole_query_capabilities_commands(query):
+    assert _command_intent(query) == "capabilities"
+
+
+@pytest.mark.parametrize("query", [
+    "What features does the software license include?",
+    "what documents mention indemnity?",
+    "Does the contract list capabilities of the vendor?",
+    "list files related to the NDA",
+    "what can you do about the termination clause?",
+    "Summarize the help desk support obligations",
+    "",
+])
+def test_queries_that_only_contain_keywords_are_not_commands(query):
+    assert _command_intent(query) == "rag"
+
+
+def test_keyword_fallback_still_matches_loosely():
+    # Only used when the model call fails, where a loose match beats no routing at all
+    assert _keyword_fallback("What features does the software license include?") == "capabilities"
+    assert _keyword_fallback("what documents mention indemnity?") == "inventory"
+    assert _keyword_fallback("What is the renewal term?") == "rag"
+
+
+def test_detect_intent_skips_the_model_only_for_commands(monkeypatch):
+    calls = []
+
+    def fake_client():
+        calls.append("client")
+        raise RuntimeError("no model in tests")
+
+    monkeypatch.setattr(intent, "_get_openai_client", fake_client)
+    intent.clear_intent_cache()
+
+    assert intent.detect_intent("list files") == "inventory"
+    assert calls == []
+
+    # A content question containing a keyword goes to the model (here failing to the fallback)
+    intent.detect_intent("Which documents mention the liability cap?")
+    assert calls == ["client"]
+    intent.clear_intent_cache()
@@ -0,0 +1,141 @@
+"""Unit tests for coalescing concurrent query embeddings in the vector store."""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.services.vector_store import _QueryEmbeddingBatcher
+
+
+class _RecordingEmbedder:
+    """Fake embed_batch that records each request and blocks while ``gate`` is clear."""
+
+    def __init__(self, delay=0.0, fail_on=None):
+        self.batches = []
+        self.threads = []
+        self.delay = delay
+        self.fail_on = fail_on
+        self.gate = threading.Event()
+        self.gate.set()
+        self.lock = threading.Lock()
+
+    def __call__(self, texts):
+        self.gate.wait(5)
+        with self.lock:
+            self.batches.append(list(texts))
+            self.threads.append(threading.current_thread().name)
+        time.sleep(self.delay)
+        if self.fail_on is not None and self.fail_on in texts:
+            raise RuntimeError(f"embedding failed for {self.fail_on}")
+        return [[float(len(text))] for text in texts]
+
+
+def _embed_all(batcher, texts):
+    with ThreadPoolExecutor(max_workers=len(texts)) as pool:
+        return list(pool.map(batcher.embed, texts))
+
+
+def test_single_caller_gets_its_embedding():
+    embedder = _RecordingEmbedder()
+    batcher = _QueryEmbeddingBatcher(embedder, max_batch=8, max_wait=0.0)
+
+    assert batcher.embed("abc") == [3.0]
+    assert embedder.batches == [["abc"]]
+
+
+def test_concurrent_callers_share_requests_and_get_their_own_results():
+    embedder = _RecordingEmbedder(delay=0.02)
+    batcher = _QueryEmbeddingBatcher(embedder, max_batch=32, max_wait=0.05)
+    texts = [f"query {'x' * i}" for i in range(20)]
+
+    results = _embed_all(batcher, texts)
+
+    assert results == [[float(len(text))] for text in texts]
+    assert sorted(text for batch in embedder.batches for text in batch) == sorted(texts)
+    assert len(embedder.batches) < len(texts)
+
+
+def test_identical_queries_are_embedded_once_per_batch():
+    embedder = _RecordingEmbedder()
+    batcher = _QueryEmbeddingBatcher(embedder, max_batch=32, max_wait=0.05)
+
+    results = _embed_all(batcher, ["same"] * 6)
+
+    assert results == [[4.0]] * 6
+    assert all(batch.count("same") == 1 for batch in embedder.batches)
+
+
+def test_batches_never_exceed_max_batch():
+    embedder = _RecordingEmbedder(delay=0.01)
+    batcher = _QueryEmbeddingBatcher(embedder, max_batch=4, max_wait=0.05)
+    texts = [f"q{i}" for i in range(23)]
+
+    results = _embed_all(batcher, texts)
+
+    assert results == [[float(len(text))] for text in texts]
+    assert all(len(batch) <= 4 for batch in embedder.batches)
+
+
+def test_leader_hands_off_after_its_own_batch():
+    embedder = _RecordingEmbedder()
+    batcher = _QueryEmbeddingBatcher(embedder, max_batch=1, max_wait=0.0)
+    embedder.gate.clear()
+
+    # The leader blocks inside embed_batch while two more callers queue behind it
+    leader_result = []
+    leader = threading.Thread(target=lambda: leader_result.append(batcher.embed("lead")), name="leader")
+    leader.start()
+    while batcher._pending or not batcher._draining:
+        time.sleep(0.001)
+    followers = ThreadPoolExecutor(max_workers=2)
+    follower_futures = [followers.submit(batcher.embed, text) for text in ("f1", "f2")]
+    while len(batcher._pending) < 2:
+        time.sleep(0.001)
+    embedder.gate.set()
+
+    leader.join(5)
+    assert leader_result == [[4.0]]
+    assert [future.result(5) for future in follower_futures] == [[2.0], [2.0]]
+    followers.shutdown()
+    # The leader returned after its own batch; queued callers sent theirs instead of it draining the queue
+    assert embedder.batches == [["lead"], ["f1"], ["f2"]]
+    assert embedder.threads[0] == "leader"
+    assert "leader" not in embedder.threads[1:]
+    assert not batcher._draining
+    assert batcher._pending == []
+
+
+def test_error_propagates_to_every_caller_in_the_failed_batch():
+    embedder = _RecordingEmbedder(fail_on="bad")
+    batcher = _QueryEmbeddingBatcher(embedder, max_batch=32, max_wait=0.1)
+    texts = ["bad", "ok1", "ok2"]
+
+    with ThreadPoolExecutor(max_workers=len(texts)) as pool:
+        futures = [pool.submit(batcher.embed, text) for text in texts]
+        outcomes = []
+        for future in futures:
+            try:
+                outcomes.append(future.result(5))
+            except RuntimeError as e:
+                outcomes.append(str(e))
+
+    # Callers batched with the failing query see its error; the batcher stays usable
+    failed_batch = next(batch for batch in embedder.batches if "bad" in batch)
+    for text, outcome in zip(texts, outcomes):
+        if text in failed_batch:
+            assert outcome == "embedding failed for bad"
+        else:
+            assert outcome == [float(len(text))]
+    assert batcher.embed("after") == [5.0]
+    assert not batcher._draining
+
+
+def test_embed_batch_error_does_not_strand_queued_callers():
+    embedder = _RecordingEmbedder(fail_on="bad")
+    batcher = _QueryEmbeddingBatcher(embedder, max_batch=1, max_wait=0.0)
+
+    with pytest.raises(RuntimeError):
+        batcher.embed("bad")
+    assert _embed_all(batcher, ["a", "bb", "ccc"]) == [[1.0], [2.0], [3.0]]
@@ -0,0 +1,152 @@
+"""Unit tests for search response caching and request coalescing."""
+
+import asyncio
+import json
+import threading
+import time
+import types
+
+import pytest
+from fastapi import BackgroundTasks
+
+from app.api import search
+from app.services import cache as cache_module
+from app.services.llm_engine import LLMEngine
+
+
+class _FakeVectorStore:
+    def embed_query(self, query):
+        return [1.0, 0.0]
+
+
+def _fake_groups():
+    return [{
+        "file_id": "f1",
+        "filename": "msa.pdf",
+        "file_path": "/uploads/msa.pdf",
+        "doc_score": 0.8,
+        "clauses": [{
+            "file_name": "msa.pdf",
+            "clause_text": "Either party may terminate on 30 days notice.",
+            "clause_snippet": "Either party may **terminate**",
+            "similarity_score": 0.7,
+            "match_type": "semantic",
+            "_original_content": "Either party may terminate on 30 days notice.",
+        }],
+    }]
+
+
+@pytest.fixture
+def searches(monkeypatch):
+    """Count search_and_group runs, stub the LLM summaries, and reset module caches."""
+    runs = []
+    lock = threading.Lock()
+
+    def fake_search_and_group(**kwargs):
+        with lock:
+            runs.append(kwargs["query"])
+        time.sleep(0.05)
+        return _fake_groups()
+
+    def fake_summarize_all(keyword, chunks_by_file, overall_chunks, **kwargs):
+        return {"overall": f"overall for {keyword}", "per_file": {name: "file summary" for name in chunks_by_file}}
+
+    monkeypatch.setattr(search.search_query, "search_and_group", fake_search_and_group)
+    monkeypatch.setattr(LLMEngine, "summarize_all", staticmethod(fake_summarize_all))
+    monkeypatch.setattr(cache_module, "_shared_cache", None)
+    search._cache.store.clear()
+    search._inflight.clear()
+    yield runs
+    search._cache.store.clear()
+    search._inflight.clear()
+
+
+def _http_request():
+    state = types.SimpleNamespace(vector_store=_FakeVectorStore())
+    return types.SimpleNamespace(app=types.SimpleNamespace(state=state))
+
+
+async def _search(query):
+    background_tasks = BackgroundTasks()
+    response = await search.search_documents(search.SearchRequest(query=query), background_tasks, _http_request())
+    await background_tasks()
+    return json.loads(response.body)
+
+
+def test_concurrent_identical_queries_run_one_search(searches):
+    async def run():
+        return await asyncio.gather(*(_search(query) for query in ["termination"] * 5 + ["Termination "]))
+
+    results = asyncio.run(run())
+
+    assert searches == ["termination"]
+    assert [result["query"] for result in results] == ["termination"] * 5 + ["Termination "]
+    assert all(result["overall_summary"] == "overall for termination" for result in results)
+
+
+def test_repeat_query_is_served_from_cache(searches):
+    async def run():
+        first = await _search("termination")
+        second = await _search("termination")
+        return first, second
+
+    first, second = asyncio.run(run())
+
+    assert searches == ["termination"]
+    assert first == second
+
+
+def test_failed_search_is_shared_and_not_cached(searches, monkeypatch):
+    def failing_search_and_group(**kwargs):
+        searches.append(kwargs["query"])
+        time.sleep(0.05)
+        raise RuntimeError("index unavailable")
+
+    monkeypatch.setattr(search.search_query, "search_and_group", failing_search_and_group)
+
+    async def run():
+        return await asyncio.gather(*(_search("termination") for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(run())
+
+    assert searches == ["termination"]
+    assert all(isinstance(result, Exception) for result in results)
+    assert len(search._cache) == 0
+    assert search._inflight == {}
+
+
+def test_stale_entry_is_served_then_refreshed_in_background(searches):
+    async def run():
+        await _search("termination")
+        # Age the cached entry past its TTL but within the stale grace period
+        key, (expires_at, value) = next(iter(search._cache.store.items()))
+        search._cache.store[key] = (expires_at - search.CACHE_TTL - 1, value)
+        assert search._cache.get(key) is None
+
+        background_tasks = BackgroundTasks()
+        response = await search.search_documents(
+            search.SearchRequest(query="termination"), background_tasks, _http_request()
+        )
+        served_before_refresh = len(searches)
+        await background_tasks()
+        return key, json.loads(response.body), served_before_refresh
+
+    key, stale, served_before_refresh = asyncio.run(run())
+
+    assert stale["overall_summary"] == "overall for termination"
+    assert served_before_refresh == 1
+    assert searches == ["termination", "termination"]
+    assert search._cache.get_stale(key)[1] is False
+
+
+def test_entry_past_stale_grace_is_recomputed_inline(searches):
+    async def run():
+        await _search("termination")
+        key, (expires_at, value) = next(iter(search._cache.store.items()))
+        search._cache.store[key] = (expires_at - search.CACHE_TTL - search.CACHE_STALE_GRACE - 1, value)
+        return await _search("termination")
+
+    result = asyncio.run(run())
+
+    assert result["overall_summary"] == "overall for termination"
+    assert searches == ["termination", "termination"]